@@ -0,0 +1,589 @@
+// 유동성 × 지수 차트 컴포넌트 (TradingView Lightweight Charts)
+// 차트 인스턴스 하나를 계속 유지하고, 렌더 메시지의 인자 변화만 반영:
+//   args.options — 라벨·높이·기간(보이는 구간)·이벤트 마커·레짐 표시 (매번 전체, 작음)
+//   args.chunks  — 일봉 데이터 조각 (id로 한 번만 적용, 서버는 컴포넌트 값을 보고 필요한 조각만 보냄)
+// 컴포넌트 값: { chart, snap, n, lo, hi, rg, visible: [from, to] } — 일봉 수, 불러온 구간과 보이는 구간 (1970-01-01 기준 일수)
+(function () {
+  'use strict';
+
+  // ── Streamlit 컴포넌트 프로토콜 (postMessage) ──
+  const send = (type, data) => window.parent.postMessage(Object.assign({ isStreamlitMessage: true, type }, data), '*');
+  const setValue = (value) => send('streamlit:setComponentValue', { value, dataType: 'json' });
+  const setHeight = (height) => send('streamlit:setFrameHeight', { height });
+
+  const decode = (b64, Type) => {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return new Type(bytes.buffer);
+  };
+  const $ = (id) => document.getElementById(id);
+
+  const wrapper = $('chart-wrapper');
+  const container = $('chart-container');
+  container.style.width = '100%';
+
+  // ── 옵션 (렌더 메시지마다 갱신) ──
+  let opt = { height: 650, liq_suffix: '', ma: [20, 60, 120], marker_gap: {}, regime_colors: [], markers: [], regimes: false };
+  let chartId = null, rangeId = null, markersKey = null;
+
+  // ── 일봉: 날짜·종가는 전체 이력, 시가·고가·저가·거래량·유동성·레짐은 불러온 구간 [LO, DN)만 값 (나머지 NaN) ──
+  let DN = 0, LO = Infinity, snap = null;   // LO = 불러온 구간 첫 일봉 (없으면 Infinity)
+  let dDays = new Int32Array(0), dC = new Float32Array(0);
+  let dO = new Float32Array(0), dH = new Float32Array(0), dL = new Float32Array(0);
+  let dV = new Float32Array(0), dLiq = new Float32Array(0);
+  let dRg = null;   // 레짐 번호 (-1 = 없음)
+  let applied = new Set();   // 적용한 조각 id
+
+  function resized(arr, Type, n, fill) {
+    const out = new Type(n).fill(fill);
+    out.set(arr.subarray(0, Math.min(arr.length, n)));
+    return out;
+  }
+
+  // 조각 적용: days·close → base_at부터 끝까지 교체, OHLCV·유동성 → at부터, regime → regime_at부터
+  function applyChunk(c) {
+    if (applied.has(c.id)) return null;
+    applied.add(c.id);
+    if (c.days) {
+      const days = decode(c.days, Int32Array);
+      for (let i = 1; i < days.length; i++) days[i] += days[i - 1];
+      DN = c.base_at + days.length;
+      dDays = resized(dDays, Int32Array, DN, 0); dDays.set(days, c.base_at);
+      dC = resized(dC, Float32Array, DN, NaN); dC.set(decode(c.close, Float32Array), c.base_at);
+      dO = resized(dO, Float32Array, DN, NaN); dH = resized(dH, Float32Array, DN, NaN);
+      dL = resized(dL, Float32Array, DN, NaN); dV = resized(dV, Float32Array, DN, 0);
+      dLiq = resized(dLiq, Float32Array, DN, NaN);
+      if (dRg) dRg = resized(dRg, Int8Array, DN, -1);
+      snap = c.snap;
+    }
+    if (c.open) {
+      dO.set(decode(c.open, Float32Array), c.at); dH.set(decode(c.high, Float32Array), c.at);
+      dL.set(decode(c.low, Float32Array), c.at); dV.set(decode(c.volume, Float32Array), c.at);
+      dLiq.set(decode(c.liq, Float32Array), c.at);
+      LO = Math.min(LO, c.at);
+    }
+    if (c.regime) {
+      if (!dRg) dRg = new Int8Array(DN).fill(-1);
+      dRg.set(decode(c.regime, Int8Array), c.regime_at);
+    }
+    return c;
+  }
+
+  // ── 봉 주기 묶음: pandas resample('W'=일요일 마감, 'ME'=월말)과 같은 라벨 경계 ──
+  const LABEL = {
+    '일봉': (d) => d,
+    '주봉': (d) => d + 6 - (d + 3) % 7,   // 1970-01-01 = 목요일
+    '월봉': (d) => { const t = new Date(d * 86400000); return Date.UTC(t.getUTCFullYear(), t.getUTCMonth() + 1, 0) / 86400000; },
+  };
+  const maKeys = () => opt.ma.map((n) => 'ma' + n);
+
+  // 전체 이력을 묶어 봉 번호를 고정 (앞쪽 조각이 추가돼도 기존 봉 번호가 바뀌지 않음).
+  // 이동평균은 전체 종가로, 시가 등은 불러온 구간에 온전히 들어오는 봉(first ≥ LO)만 값이 있음
+  function resample(tf) {
+    const label = LABEL[tf];
+    const lab = [], first = [];
+    for (let i = 0; i < DN; i++) {
+      const k = label(dDays[i]);
+      if (!lab.length || lab[lab.length - 1] !== k) { lab.push(k); first.push(i); }
+    }
+    const n = lab.length;
+    first.push(DN);
+    const S = { n, days: Int32Array.from(lab), first: n, bar: new Int32Array(DN) };
+    for (const k of ['o', 'h', 'l', 'c', 'v', 'liq']) S[k] = new Float32Array(n).fill(NaN);
+    S.rg = dRg && new Float32Array(n).fill(-1);
+    const close = new Float64Array(n);
+    for (let j = 0; j < n; j++) {
+      const a = first[j], z = first[j + 1];
+      for (let i = a; i < z; i++) S.bar[i] = j;
+      close[j] = S.c[j] = dC[z - 1];
+      if (a < LO) continue;
+      if (S.first === n) S.first = j;
+      let h = -Infinity, l = Infinity, v = 0;
+      for (let i = a; i < z; i++) {
+        if (dH[i] > h) h = dH[i];
+        if (dL[i] < l) l = dL[i];
+        v += dV[i];
+      }
+      S.o[j] = dO[a]; S.h[j] = h > -Infinity ? h : NaN; S.l[j] = l < Infinity ? l : NaN; S.v[j] = v;
+      S.liq[j] = dLiq[z - 1];
+      if (S.rg) S.rg[j] = dRg[z - 1];
+    }
+    opt.ma.forEach((len) => {
+      const out = new Float32Array(n).fill(NaN);
+      let sum = 0;
+      for (let j = 0; j < n; j++) {
+        sum += close[j];
+        if (j >= len) sum -= close[j - len];
+        if (j >= len - 1) out[j] = sum / len;
+      }
+      S['ma' + len] = out;
+    });
+    return S;
+  }
+
+  // 이벤트 마커: 날짜 → 가장 가까운 일봉 → 봉 번호, 봉 주기별 최소 간격 적용 (불러온 구간 밖은 제외)
+  function snapMarkers(tf, S) {
+    const gap = opt.marker_gap[tf] || 5, out = [];
+    let prev = -999;
+    for (const m of opt.markers) {
+      let lo = 0, hi = DN - 1;
+      while (lo < hi) { const mid = (lo + hi) >> 1; if (dDays[mid] < m.day) lo = mid + 1; else hi = mid; }
+      const i = lo > 0 && m.day - dDays[lo - 1] <= dDays[lo] - m.day ? lo - 1 : lo;
+      const j = S.bar[i];
+      if (j < S.first || Math.abs(j - prev) < gap) continue;
+      prev = j;
+      const { day, ...rest } = m;
+      out.push({ ...rest, i: j });
+    }
+    return out;
+  }
+
+  // 현재 봉 주기 상태
+  let TF = null, N = 0, S = null, realDays = new Int32Array(0), markerSrc = [];
+  const realDate = (i) => new Date(realDays[i] * 86400000).toISOString().slice(0, 10);
+
+  // 가상 시간: 봉 번호 i → 2000-01-03 UTC + i일 (모든 봉 균일 간격)
+  const T0 = Date.UTC(2000, 0, 3) / 1000;
+  const timeOf = (i) => T0 + i * 86400;
+  const indexOf = (t) => Math.round((t - T0) / 86400);
+
+  // ── LOD(level of detail): 현재 봉 주기의 봉을 2^k개씩 묶은 단계를 필요할 때만 만들어 재사용 ──
+  // 묶음 j = 원본 [j·b, (j+1)·b) → 시가=첫 봉, 고가=max, 저가=min, 종가·이평·유동성·레짐=끝 봉, 거래량=합
+  let levels = {};
+  function level(b) {
+    if (levels[b]) return levels[b];
+    const f = level(b / 2), n = Math.ceil(f.n / 2);
+    const lv = { n };
+    for (const k of ['o', 'h', 'l', 'c', 'v', 'liq', ...maKeys()]) lv[k] = new Float32Array(n);
+    for (let j = 0; j < n; j++) {
+      const a = 2 * j, z = Math.min(a + 1, f.n - 1);
+      lv.o[j] = f.o[a];
+      lv.h[j] = Math.max(f.h[a], f.h[z]);
+      lv.l[j] = Math.min(f.l[a], f.l[z]);
+      lv.c[j] = f.c[z];
+      lv.v[j] = z > a ? f.v[a] + f.v[z] : f.v[a];
+      for (const k of maKeys()) lv[k][j] = f[k][z];
+      lv.liq[j] = f.liq[z];
+    }
+    lv.rg = f.rg && lv.c.map((_, j) => f.rg[Math.min(2 * j + 1, f.n - 1)]);
+    return (levels[b] = lv);
+  }
+  const minStart = (b) => Math.ceil(S.first / b) * b;   // 묶음이 불러온 구간 안에 온전히 들어오는 첫 원본 봉
+
+  // ── 차트 생성 (한 번만) ──
+  const chart = LightweightCharts.createChart(container, {
+    width: wrapper.clientWidth,
+    height: opt.height,
+    layout: {
+      background: { type: 'solid', color: '#ffffff' },
+      textColor: '#64748b',
+      fontFamily: "'SF Mono', 'Consolas', monospace",
+      fontSize: 11,
+    },
+    grid: {
+      vertLines: { color: 'rgba(226,232,240,0.4)', style: 1 },
+      horzLines: { color: 'rgba(226,232,240,0.4)', style: 1 },
+    },
+    crosshair: {
+      mode: LightweightCharts.CrosshairMode.Normal,
+      vertLine: {
+        width: 1, color: 'rgba(100,116,139,0.35)',
+        style: LightweightCharts.LineStyle.Dashed,
+        labelVisible: false,
+      },
+      horzLine: {
+        width: 1, color: 'rgba(100,116,139,0.35)',
+        style: LightweightCharts.LineStyle.Dashed,
+        labelBackgroundColor: '#475569',
+      },
+    },
+    rightPriceScale: {
+      borderColor: '#e2e8f0',
+      scaleMargins: { top: 0.08, bottom: 0.25 },
+      autoScale: true,
+    },
+    timeScale: {
+      borderColor: '#e2e8f0',
+      timeVisible: false,
+      secondsVisible: false,
+      rightOffset: 3,
+      barSpacing: 6,   // 모든 봉 주기 동일 (균일 간격이므로)
+      minBarSpacing: 0.5,
+      fixLeftEdge: false,
+      fixRightEdge: false,
+      tickMarkFormatter: function (time) {
+        // 가상 시간 → 실제 날짜 변환하여 표시
+        const i = indexOf(time);
+        if (i < 0 || i >= N) return '';
+        const real = realDate(i);
+        return real.slice(2, 4) + '/' + real.slice(5, 7);
+      },
+    },
+    handleScroll: {
+      mouseWheel: true,
+      pressedMouseMove: true,
+      horzTouchDrag: true,
+      vertTouchDrag: false,
+    },
+    handleScale: {
+      axisPressedMouseMove: true,
+      mouseWheel: true,
+      pinch: true,
+    },
+    localization: {
+      timeFormatter: function (time) {
+        const i = indexOf(time);
+        return i >= 0 && i < N ? realDate(i) : '';
+      },
+    },
+  });
+
+  // ── 레짐 배경 (맨 먼저 추가해 다른 시리즈 뒤에 그려지도록, 전체 높이 막대) ──
+  const regimeSeries = chart.addHistogramSeries({
+    priceScaleId: 'regime',
+    priceLineVisible: false,
+    lastValueVisible: false,
+    base: 0,
+  });
+  chart.priceScale('regime').applyOptions({
+    scaleMargins: { top: 0, bottom: 0 },
+    borderVisible: false,
+    visible: false,
+  });
+
+  // ── 캔들스틱 ──
+  const candleSeries = chart.addCandlestickSeries({
+    upColor: '#10b981',
+    downColor: '#ef4444',
+    borderUpColor: '#10b981',
+    borderDownColor: '#ef4444',
+    wickUpColor: '#10b981',
+    wickDownColor: '#ef4444',
+    priceFormat: { type: 'price', precision: 0, minMove: 1 },
+  });
+
+  // ── 이동평균선 ──
+  const maLine = (color) => chart.addLineSeries({
+    color, lineWidth: 1.5, lineStyle: 0,
+    priceLineVisible: false, lastValueVisible: false,
+    crosshairMarkerVisible: false,
+  });
+  const ma20Series = maLine('#f59e0b');
+  const ma60Series = maLine('#3b82f6');
+  const ma120Series = maLine('#8b5cf6');
+
+  // ── 유동성 (별도 price scale, 영역 차트) ──
+  const liqSeries = chart.addAreaSeries({
+    topColor: 'rgba(59,130,246,0.12)',
+    bottomColor: 'rgba(59,130,246,0.01)',
+    lineColor: 'rgba(59,130,246,0.45)',
+    lineWidth: 1.5,
+    priceScaleId: 'liq',
+    priceLineVisible: false,
+    lastValueVisible: false,
+    crosshairMarkerVisible: false,
+    priceFormat: { type: 'custom', formatter: (p) => p.toLocaleString() + opt.liq_suffix },
+  });
+  chart.priceScale('liq').applyOptions({
+    scaleMargins: { top: 0.50, bottom: 0.25 },
+    borderVisible: false,
+    visible: false,
+  });
+
+  // ── 거래량 히스토그램 ──
+  const volumeSeries = chart.addHistogramSeries({
+    priceFormat: { type: 'volume' },
+    priceScaleId: 'vol',
+    priceLineVisible: false,
+    lastValueVisible: false,
+  });
+  chart.priceScale('vol').applyOptions({
+    scaleMargins: { top: 0.82, bottom: 0 },
+    borderVisible: false,
+    visible: false,
+  });
+
+  // ── LOD 렌더링: 보이는 구간의 원본 봉 수와 화면 폭으로 묶음 크기를 고르고,
+  //    화면 앞뒤 한 화면씩만 시리즈에 올림 → 기간을 늘려도 그리는 봉 수는 화면 폭에 비례 ──
+  const MIN_BAR_PX = 3;   // 봉 하나가 이보다 좁아지면 한 단계 더 묶음
+  let cur = { b: 1, s: 0, e: 0 };   // 현재 묶음 크기, 올라간 원본 구간 [s, e)
+  let applying = false;
+
+  const volColor = (lv, j) => lv.c[j] >= lv.o[j] ? 'rgba(16,185,129,0.4)' : 'rgba(239,68,68,0.4)';
+  const showRegimes = () => opt.regimes && S.rg;
+
+  function render(b, s, e) {
+    const lv = level(b), j0 = s / b, j1 = Math.ceil(e / b);
+    const candles = [], vols = [], m20 = [], m60 = [], m120 = [], lq = [], rg = [];
+    const push = (arr, t, v) => { if (!Number.isNaN(v)) arr.push({ time: t, value: v }); };
+    for (let j = j0; j < j1; j++) {
+      const t = timeOf(j * b);
+      candles.push({ time: t, open: lv.o[j], high: lv.h[j], low: lv.l[j], close: lv.c[j] });
+      vols.push({ time: t, value: lv.v[j], color: volColor(lv, j) });
+      push(m20, t, lv.ma20[j]); push(m60, t, lv.ma60[j]); push(m120, t, lv.ma120[j]); push(lq, t, lv.liq[j]);
+      if (showRegimes() && lv.rg[j] >= 0) rg.push({ time: t, value: 1, color: opt.regime_colors[lv.rg[j]] });
+    }
+    regimeSeries.setData(rg);
+    candleSeries.setData(candles);
+    volumeSeries.setData(vols);
+    ma20Series.setData(m20); ma60Series.setData(m60); ma120Series.setData(m120);
+    liqSeries.setData(lq);
+    // 마커 (이벤트) — 봉 번호를 현재 묶음의 시작 봉으로 스냅
+    candleSeries.setMarkers(markerSrc
+      .filter(m => m.i >= s && m.i < e)
+      .map(({ i, ...m }) => ({ ...m, time: timeOf(Math.floor(i / b) * b) })));
+    cur = { b, s, e };
+  }
+
+  function chooseLevel(span) {
+    const width = wrapper.clientWidth || 800;
+    let b = 1;
+    while (b < N && span / b * MIN_BAR_PX > width) b *= 2;
+    return b;
+  }
+
+  function windowFor(b, center) {
+    // 화면 3개 분량(원본 봉 단위), 경계는 b의 배수로 맞추고 불러온 구간 안으로 제한
+    const size = Math.ceil((wrapper.clientWidth || 800) / MIN_BAR_PX) * b * 3;
+    const e = Math.min(N, Math.max(minStart(b), Math.floor((center - size / 2) / b) * b) + size);
+    return [Math.max(minStart(b), Math.floor((e - size) / b) * b), e];
+  }
+
+  // 보이는 구간 (원본 봉 번호)
+  function visibleBars() {
+    const r = chart.timeScale().getVisibleLogicalRange();
+    return r ? [cur.s + r.from * cur.b, cur.s + r.to * cur.b] : null;
+  }
+
+  // 원본 봉 구간 [from, to]를 보이도록 묶음 단계·창을 다시 고르고 올림
+  function show(from, to) {
+    from = Math.max(S.first, from); to = Math.min(N, Math.max(from + 1, to));
+    const b = chooseLevel(Math.max(1, to - from));
+    const [s, e] = windowFor(b, (from + to) / 2);
+    applying = true;
+    render(b, s, e);
+    chart.timeScale().setVisibleLogicalRange({ from: (from - s) / b, to: (to - s) / b });
+    applying = false;
+  }
+
+  function refreshLod() {
+    if (applying || !N) return;
+    const v = visibleBars();
+    if (!v) return;
+    const [from, to] = v;
+    const span = Math.max(1, to - from);
+    const b = chooseLevel(span);
+    const nearEdge = (from < cur.s + span / 2 && cur.s > minStart(cur.b)) || (to > cur.e - span / 2 && cur.e < N);
+    if (b !== cur.b || nearEdge) show(from, to);
+    // 불러온 구간 왼쪽 끝에 한 화면 안으로 다가가면 서버에 앞쪽 일봉을 요청
+    if (from < S.first + span && LO > 0) report(true);
+  }
+
+  chart.timeScale().subscribeVisibleLogicalRangeChange(() => requestAnimationFrame(refreshLod));
+
+  // ── 크로스헤어 실시간 정보 ──
+  const fmt = (n) => n != null ? n.toLocaleString(undefined, { maximumFractionDigits: 0 }) : '-';
+  const fmtVol = (n) => {
+    if (n == null) return '-';
+    if (n >= 1e9) return (n / 1e9).toFixed(1) + 'B';
+    if (n >= 1e6) return (n / 1e6).toFixed(1) + 'M';
+    if (n >= 1e3) return (n / 1e3).toFixed(1) + 'K';
+    return n.toFixed(0);
+  };
+
+  function updateInfo(param) {
+    if (!N) return;
+    // 크로스헤어가 없으면 마지막 봉 — 묶음 단계에서는 묶음 단위 값
+    const b = cur.b, lv = level(b);
+    const j = param && param.time != null ? Math.floor(indexOf(param.time) / b) : lv.n - 1;
+    if (j < 0 || j >= lv.n) return;
+    const i = j * b, last = Math.min(i + b, N) - 1;
+
+    // 실제 날짜 표시 (묶음이면 시작 ~ 끝)
+    $('v-date').textContent = b === 1 ? realDate(i) : realDate(i) + ' ~ ' + realDate(last);
+
+    const o = lv.o[j], h = lv.h[j], l = lv.l[j], c = lv.c[j];
+    const clr = c >= o ? '#10b981' : '#ef4444';
+
+    $('v-open').textContent = fmt(o);
+    $('v-high').textContent = fmt(h);
+    $('v-high').style.color = '#10b981';
+    $('v-low').textContent = fmt(l);
+    $('v-low').style.color = '#ef4444';
+    $('v-close').textContent = fmt(c);
+    $('v-close').style.color = clr;
+
+    // 전봉 대비 변화율
+    if (j > 0) {
+      const prevC = lv.c[j - 1];
+      const chg = ((c - prevC) / prevC * 100);
+      const arrow = chg >= 0 ? '▲' : '▼';
+      $('v-chg').textContent = arrow + ' ' + Math.abs(chg).toFixed(2) + '%';
+      $('v-chg').style.color = chg >= 0 ? '#10b981' : '#ef4444';
+    }
+
+    $('v-vol').textContent = fmtVol(lv.v[j]);
+
+    const liqVal = lv.liq[j];
+    $('v-liq').textContent = liqVal ? fmt(liqVal) + opt.liq_suffix : '-';
+
+    const m20 = lv.ma20[j];
+    $('v-ma20').textContent = 'MA20 ' + (m20 ? fmt(m20) : '-');
+    const m60 = lv.ma60[j];
+    $('v-ma60').textContent = 'MA60 ' + (m60 ? fmt(m60) : '-');
+    const m120 = lv.ma120[j];
+    $('v-ma120').textContent = 'MA120 ' + (m120 ? fmt(m120) : '-');
+  }
+
+  chart.subscribeCrosshairMove(updateInfo);
+
+  // ── 봉 주기 다시 묶기 (데이터 조각 적용·봉 주기 전환 공통) ──
+  function rebuild(tf) {
+    TF = tf;
+    S = resample(tf);
+    N = S.n; realDays = S.days; levels = { 1: S };
+    markerSrc = snapMarkers(tf, S);
+  }
+
+  // 실제 날짜(일수) → 그 날 이후 첫 봉 번호
+  function barAtDay(day) {
+    let lo = 0, hi = N;
+    while (lo < hi) { const mid = (lo + hi) >> 1; if (realDays[mid] < day) lo = mid + 1; else hi = mid; }
+    return lo;
+  }
+
+  // ── 봉 주기 전환: 보던 날짜 구간을 유지한 채 다시 묶음 ──
+  const tfSwitch = $('tf-switch');
+  function setTimeframe(tf) {
+    const v = N ? visibleBars() : null;
+    const days = v && [realDays[Math.max(0, Math.min(N - 1, Math.floor(v[0])))], realDays[Math.max(0, Math.min(N - 1, Math.ceil(v[1])))]];
+    rebuild(tf);
+    for (const btn of tfSwitch.querySelectorAll('button')) btn.setAttribute('aria-pressed', String(btn.dataset.tf === tf));
+    $('v-tf').textContent = tf;
+    if (N) {
+      if (days) show(Math.max(S.first, barAtDay(days[0])), barAtDay(days[1]) + 1);
+      else show(S.first, N);
+      updateInfo(null);
+    }
+    try { sessionStorage.setItem('lw-timeframe', tf); } catch (e) {}
+  }
+  tfSwitch.addEventListener('click', (e) => {
+    const tf = e.target.dataset && e.target.dataset.tf;
+    if (tf && tf !== TF) setTimeframe(tf);
+  });
+
+  // ── 끝부분 갱신(tail 조각): 화면 창이 끝에 닿아 있으면 바뀐 끝 봉만 series.update() ──
+  function updateTail(prevN, fromDay) {
+    if (cur.e < prevN) return false;   // 과거 구간을 보는 중 — 다음 LOD 전환 때 새 봉이 반영됨
+    const b = cur.b, lv = level(b), j0 = Math.floor(barAtDay(fromDay) / b);
+    if (j0 < Math.floor((prevN - 1) / b)) return false;   // 끝 봉보다 앞이 바뀜 — update()로는 못 고침
+    for (let j = j0; j < lv.n; j++) {
+      const t = timeOf(j * b);
+      candleSeries.update({ time: t, open: lv.o[j], high: lv.h[j], low: lv.l[j], close: lv.c[j] });
+      volumeSeries.update({ time: t, value: lv.v[j], color: volColor(lv, j) });
+      if (!Number.isNaN(lv.ma20[j])) ma20Series.update({ time: t, value: lv.ma20[j] });
+      if (!Number.isNaN(lv.ma60[j])) ma60Series.update({ time: t, value: lv.ma60[j] });
+      if (!Number.isNaN(lv.ma120[j])) ma120Series.update({ time: t, value: lv.ma120[j] });
+      if (!Number.isNaN(lv.liq[j])) liqSeries.update({ time: t, value: lv.liq[j] });
+      if (showRegimes() && lv.rg[j] >= 0) regimeSeries.update({ time: t, value: 1, color: opt.regime_colors[lv.rg[j]] });
+    }
+    cur = { b, s: cur.s, e: N };
+    return true;
+  }
+
+  // ── 서버에 상태 보고 (불러온 구간·스냅샷·보이는 구간) — 값이 바뀔 때만, 짧게 모아서.
+  //    보이는 구간은 불러온 구간 왼쪽 끝에 다가갔을 때만 갱신 (서버가 그 앞쪽 조각을 보냄) ──
+  let lastReported = null, reportTimer = null, reportedVisible = null;
+  function report(withVisible) {
+    if (!N) return;
+    if (withVisible) {
+      const v = visibleBars();
+      if (v) reportedVisible = [realDays[Math.max(0, Math.min(N - 1, Math.floor(v[0])))], realDays[Math.max(0, Math.min(N - 1, Math.ceil(v[1])))]];
+    }
+    clearTimeout(reportTimer);
+    reportTimer = setTimeout(() => {
+      const value = { chart: chartId, snap, n: DN, lo: dDays[LO], hi: dDays[DN - 1], rg: !!dRg, visible: reportedVisible };
+      const key = JSON.stringify(value);
+      if (key !== lastReported) { lastReported = key; setValue(value); }
+    }, 250);
+  }
+
+  // ── 지수 변경: 데이터·상태 초기화 (차트 인스턴스와 시리즈는 그대로) ──
+  function reset(id) {
+    chartId = id; rangeId = null; markersKey = null; snap = null;
+    DN = 0; LO = Infinity; dRg = null; applied = new Set();
+    dDays = new Int32Array(0); dC = new Float32Array(0);
+    dO = new Float32Array(0); dH = new Float32Array(0); dL = new Float32Array(0);
+    dV = new Float32Array(0); dLiq = new Float32Array(0);
+    N = 0; S = null; cur = { b: 1, s: 0, e: 0 }; reportedVisible = null;
+  }
+
+  function applyOptions(o) {
+    opt = o;
+    wrapper.style.height = o.height + 'px';
+    container.style.height = o.height + 'px';
+    chart.applyOptions({ height: o.height });
+    $('v-idx').textContent = o.idx_name;
+    $('v-liq-label').textContent = o.liq_label;
+    $('v-liq-legend').textContent = o.liq_label;
+    wrapper.setAttribute('aria-label', o.idx_name + ' 가격 차트 - 캔들스틱, 이동평균선, 유동성 오버레이 포함');
+    container.setAttribute('aria-label', o.idx_name + ' 인터랙티브 차트');
+  }
+
+  // ── 렌더 메시지: 옵션 반영 → 새 조각 적용 → 필요한 만큼만 다시 그림 ──
+  function onRender(args) {
+    const o = args.options;
+    if (o.chart !== chartId) reset(o.chart);
+    applyOptions(o);
+    setHeight(o.height + 10);
+
+    const prevN = N, prevLO = LO;
+    const chunks = (args.chunks || []).map(applyChunk).filter(Boolean);
+    const newMarkers = JSON.stringify([o.markers, o.regimes]);
+    if (!DN || LO >= DN) return;
+    if (chunks.length === 0 && newMarkers === markersKey && o.range.id === rangeId) return;
+    markersKey = newMarkers;
+
+    let initialTf = TF || o.default_tf;
+    if (!TF) {
+      try { initialTf = sessionStorage.getItem('lw-timeframe') || initialTf; } catch (e) {}
+      if (!LABEL[initialTf]) initialTf = o.default_tf;
+    }
+    const v = prevN ? visibleBars() : null;
+    rebuild(initialTf);
+    for (const btn of tfSwitch.querySelectorAll('button')) btn.setAttribute('aria-pressed', String(btn.dataset.tf === TF));
+    $('v-tf').textContent = TF;
+
+    if (o.range.id !== rangeId) {
+      // 기간 선택: 그 날짜부터 끝까지 보이도록 (앞쪽이 아직 없으면 보고 후 서버가 채워 보냄)
+      rangeId = o.range.id;
+      show(Math.max(S.first, barAtDay(o.range.from)), N);
+    } else if (chunks.length && chunks.every((c) => c.days && c.base_at > 0) && prevLO === LO
+               && updateTail(prevN, dDays[Math.min(...chunks.map((c) => c.base_at))])) {
+      // 끝부분만 바뀜 — update()로 반영 완료
+    } else if (v) {
+      show(Math.max(S.first, v[0]), v[1]);   // 같은 화면 구간 유지 (봉 번호는 조각이 추가돼도 불변)
+    } else {
+      show(S.first, N);
+    }
+    updateInfo(null);
+    report(false);
+  }
+
+  window.addEventListener('message', (e) => {
+    const d = e.data;
+    if (d && d.type === 'streamlit:render') onRender(d.args);
+  });
+
+  // ── 반응형 리사이즈 ──
+  const resizeObserver = new ResizeObserver(entries => {
+    for (const entry of entries) {
+      chart.applyOptions({ width: entry.contentRect.width });
+    }
+    refreshLod();
+  });
+  resizeObserver.observe(wrapper);
+
+  send('streamlit:componentReady', { apiVersion: 1 });
+})();
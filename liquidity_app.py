@@ -6,11 +6,26 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import numpy as np
+import base64
+import hashlib
+import io
 import json
+import os
+import pickle
 import threading
+import time
 import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from pathlib import Path
 from zoneinfo import ZoneInfo
 
+try:
+    import fcntl  # POSIX 전용: 워커 프로세스 간 파일 락
+except ImportError:
+    fcntl = None
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # Keep-alive: 백그라운드 self-ping으로 슬립 방지
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -46,23 +61,29 @@ try:
 except Exception:
     pass  # 파일이 없거나 구버전 Streamlit일 경우 무시
 
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# 자동 새로고침 (5분 간격 실시간 업데이트)
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-REFRESH_INTERVAL_SEC = 300  # 5분마다 자동 새로고침
+# 부분 재실행(st.fragment, 1.37+) — 구버전이면 일반 함수로 동작 (조작 시 전체 재실행)
+_st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def fragment(fn=None, *, run_every=None):
+    """@fragment / @fragment(run_every=초) — 프래그먼트가 없는 버전에서는 일반 함수 (주기 실행 없음)"""
+    if _st_fragment is None:
+        return fn if fn is not None else (lambda f: f)
+    return _st_fragment(fn, run_every=run_every) if fn is not None else _st_fragment(run_every=run_every)
 
-def get_next_refresh():
-    """다음 새로고침 시각 계산 (5분 간격)"""
-    utc_now = datetime.now(ZoneInfo("UTC"))
-    next_t = utc_now + timedelta(seconds=REFRESH_INTERVAL_SEC)
-    local_next = next_t.astimezone(ZoneInfo("Asia/Seoul"))
-    return local_next, REFRESH_INTERVAL_SEC
 
-NEXT_REFRESH_TIME, REFRESH_SECS = get_next_refresh()
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 실시간 갱신 (5분 간격 데이터 갱신, 1분 간격 변경 확인 — 페이지 새로고침 없음)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+REFRESH_INTERVAL_SEC = 300  # 데이터셋 스냅샷 갱신 주기
+REFRESH_LEAD_SEC = 60       # 백그라운드 갱신은 만료 60초 전에 미리 수행
+REFRESH_CYCLE_SEC = REFRESH_INTERVAL_SEC - REFRESH_LEAD_SEC
+LIVE_POLL_SEC = 60          # 세션별 스냅샷 변경 확인 주기 (바뀐 게 없으면 아무것도 다시 그리지 않음)
 
 st.markdown(
-    f'<meta http-equiv="refresh" content="{REFRESH_INTERVAL_SEC}">'
-    f'<meta name="description" content="중앙은행 유동성과 주가지수의 상관관계를 실시간으로 분석하는 대시보드입니다.">'
+    # 주기 프래그먼트가 없는 구버전만 예전처럼 페이지 전체 새로고침
+    (f'<meta http-equiv="refresh" content="{REFRESH_INTERVAL_SEC}">' if _st_fragment is None else '')
+    + f'<meta name="description" content="중앙은행 유동성과 주가지수의 상관관계를 실시간으로 분석하는 대시보드입니다.">'
     f'<script>document.documentElement.setAttribute("lang", "ko");</script>'
     '<script>'
     '(function(){'
@@ -169,6 +190,7 @@ a:focus-visible, button:focus-visible, [tabindex]:focus-visible {
 .kpi-delta { font-family: 'IBM Plex Mono', monospace; font-size: 0.76rem; font-weight: 500; margin-top: 0.25rem; }
 .kpi-delta.up { color: var(--accent-green); }
 .kpi-delta.down { color: var(--accent-red); }
+.kpi-surface { font-family: 'IBM Plex Mono', monospace; font-size: 0.66rem; color: var(--text-muted); margin-top: 0.3rem; line-height: 1.5; }
 
 /* ── 리포트 박스 ── */
 .report-box {
@@ -200,6 +222,8 @@ a:focus-visible, button:focus-visible, [tabindex]:focus-visible {
 }
 .refresh-dot { width: 6px; height: 6px; border-radius: 50%; background: var(--accent-green); animation: pulse 2s infinite; flex-shrink: 0; }
 @keyframes pulse { 0%,100%{opacity:1} 50%{opacity:0.3} }
+.refresh-bar.stale { background: rgba(245,158,11,0.08); border-color: rgba(245,158,11,0.3); color: #92400e; }
+.refresh-bar.stale .refresh-dot { background: var(--accent-amber); }
 
 /* ── 타임라인 ── */
 .timeline { display: flex; flex-direction: column; gap: 0; }
@@ -213,6 +237,9 @@ a:focus-visible, button:focus-visible, [tabindex]:focus-visible {
 .tl-dir { font-size: 0.7rem; font-weight: 700; padding: 1px 7px; border-radius: 4px; flex-shrink: 0; }
 .tl-dir.up { background: rgba(16,185,129,0.1); color: var(--accent-green); }
 .tl-dir.down { background: rgba(239,68,68,0.1); color: var(--accent-red); }
+.tl-impact { font-family: 'IBM Plex Mono', monospace; font-size: 0.72rem; color: var(--text-muted); margin-top: 4px; display: flex; flex-wrap: wrap; gap: 2px 10px; }
+.tl-impact .up { color: var(--accent-green); }
+.tl-impact .down { color: var(--accent-red); }
 
 /* ── 가이드 박스 ── */
 .guide-box {
@@ -222,6 +249,13 @@ a:focus-visible, button:focus-visible, [tabindex]:focus-visible {
 }
 .guide-box strong { color: var(--text-primary); }
 
+/* ── 백테스트 표 ── */
+.bt-table { width: 100%; border-collapse: collapse; font-size: 0.8rem; margin-top: 0.6rem; }
+.bt-table th { text-align: right; font-weight: 600; color: var(--text-muted); padding: 6px 8px; border-bottom: 1px solid var(--border); }
+.bt-table td { text-align: right; font-family: 'IBM Plex Mono', monospace; padding: 6px 8px; border-bottom: 1px solid var(--border); }
+.bt-table th:first-child, .bt-table td:first-child { text-align: left; font-family: inherit; }
+.bt-table tr.current td { background: #eff6ff; }
+
 /* ── 공통 ── */
 div[data-testid="stMetric"] { display: none; }
 footer { display: none !important; }
@@ -596,18 +630,662 @@ COUNTRY_CONFIG = {
 }
 
 
-@st.cache_data(ttl=300, show_spinner=False)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 데이터 프로바이더 (Yahoo · FRED · 오프라인 파일 재생)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# MYQUANT_DATA_SOURCE=offline 이면 MYQUANT_FIXTURE_DIR 아래 녹화 파일만 사용 (네트워크 없이 결정적 실행).
+# 히스토리 저장소(.cache/history)가 같은 레이아웃이므로 온라인 실행 후 그대로 픽스처로 재사용 가능.
+DATA_SOURCE = os.environ.get("MYQUANT_DATA_SOURCE", "live")
+FIXTURE_DIR = Path(os.environ.get("MYQUANT_FIXTURE_DIR", Path(__file__).parent / ".cache" / "history"))
+
+
+def _safe_key(key):
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in key)
+
+
+class MarketDataProvider:
+    """시세·뉴스 데이터 소스 인터페이스"""
+
+    def ohlc(self, ticker, start, end):
+        """일봉 OHLCV (열: Open, High, Low, Close, Volume / tz-naive 날짜 인덱스)"""
+        raise NotImplementedError
+
+    def close_panel(self, tickers, start, end):
+        """여러 티커 종가 wide 패널 (열 = 티커, 응답 없는 티커는 NaN 열)"""
+        raise NotImplementedError
+
+    def news(self, ticker):
+        """yfinance news 형식의 원본 뉴스 항목 리스트"""
+        raise NotImplementedError
+
+
+class MacroDataProvider:
+    """거시 시계열 데이터 소스 인터페이스"""
+
+    def series(self, codes, start, end):
+        """열 = 시리즈 ID인 DataFrame"""
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    def ohlc(self, ticker, start, end):
+        """yfinance OHLC 다운로드 (yf.download → Ticker.history 폴백)"""
+        import yfinance as yf
+
+        # 방법 1: yf.download (auto_adjust=False, multi_level_index=False)
+        try:
+            yf_data = yf.download(
+                ticker, start=start, end=end,
+                progress=False, auto_adjust=False, multi_level_index=False
+            )
+        except TypeError:
+            # 구버전 yfinance: multi_level_index 미지원
+            yf_data = yf.download(
+                ticker, start=start, end=end,
+                progress=False, auto_adjust=False
+            )
+
+        # MultiIndex 컬럼이 남아있으면 평탄화
+        if isinstance(yf_data.columns, pd.MultiIndex):
+            yf_data.columns = [col[0] for col in yf_data.columns]
+
+        # 방법 1 실패 시 → 방법 2: yf.Ticker().history() 폴백
+        if yf_data.empty:
+            t = yf.Ticker(ticker)
+            yf_data = t.history(start=start, end=end, auto_adjust=False)
+            if isinstance(yf_data.columns, pd.MultiIndex):
+                yf_data.columns = [col[0] for col in yf_data.columns]
+
+        if yf_data.empty:
+            return yf_data
+        if yf_data.index.tz is not None:
+            yf_data.index = yf_data.index.tz_localize(None)
+        return yf_data[['Open','High','Low','Close','Volume']]
+
+    def close_panel(self, tickers, start, end):
+        """여러 티커 종가를 한 번의 요청으로 받아 wide 패널(열=티커)로 반환"""
+        import yfinance as yf
+        data = yf.download(
+            tickers, start=start, end=end,
+            progress=False, auto_adjust=False, group_by="column", threads=True
+        )
+        if data.empty:
+            return pd.DataFrame(columns=tickers, dtype=float)
+        if isinstance(data.columns, pd.MultiIndex):
+            close = data["Close"]
+        else:
+            # 티커 1개만 응답한 경우 단일 레벨 컬럼
+            close = data[["Close"]].set_axis(tickers[:1], axis=1)
+        if close.index.tz is not None:
+            close.index = close.index.tz_localize(None)
+        return close.reindex(columns=tickers).astype(float)
+
+    def news(self, ticker):
+        import yfinance as yf
+        t = yf.Ticker(ticker)
+        return (t.news or []) if hasattr(t, 'news') else []
+
+
+class FredProvider(MacroDataProvider):
+    def series(self, codes, start, end):
+        return web.DataReader(codes, "fred", start, end)
+
+
+class LocalFileProvider(MarketDataProvider, MacroDataProvider):
+    """녹화된 픽스처 재생: <root>/yahoo/<티커>.parquet|csv (OHLCV), <root>/yahoo_close/<티커>.parquet|csv
+    (열 = 티커인 종가), <root>/fred/<코드>.parquet|csv, <root>/news/<티커>.json.
+    히스토리 저장소와 같은 레이아웃 — 요청 기간으로 잘라 반환하므로 네트워크 없이 같은 결과를 재현."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _read(self, source, key):
+        base = self.root / source / _safe_key(key)
+        parquet, csv = base.with_suffix(".parquet"), base.with_suffix(".csv")
+        if parquet.exists():
+            return pd.read_parquet(parquet)
+        if csv.exists():
+            return pd.read_csv(csv, index_col=0, parse_dates=True)
+        return None
+
+    @staticmethod
+    def _slice(df, start, end):
+        return df[(df.index >= pd.to_datetime(start)) & (df.index < pd.to_datetime(end))]
+
+    def ohlc(self, ticker, start, end):
+        df = self._read("yahoo", ticker)
+        if df is None:
+            return pd.DataFrame(columns=['Open','High','Low','Close','Volume'])
+        return self._slice(df, start, end)[['Open','High','Low','Close','Volume']]
+
+    def close_panel(self, tickers, start, end):
+        closes = {}
+        for ticker in tickers:
+            df = self._read("yahoo_close", ticker)
+            if df is not None and ticker in df.columns:
+                closes[ticker] = self._slice(df, start, end)[ticker]
+                continue
+            df = self._read("yahoo", ticker)   # 종가 저장소에 없으면 OHLC 픽스처의 종가
+            if df is not None:
+                closes[ticker] = self._slice(df, start, end)["Close"]
+        return pd.DataFrame(closes).reindex(columns=tickers).astype(float)
+
+    def news(self, ticker):
+        path = self.root / "news" / f"{_safe_key(ticker)}.json"
+        if not path.exists():
+            return []
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def series(self, codes, start, end):
+        frames = [self._read("fred", code) for code in codes]
+        frames = [self._slice(df, start, end) for df in frames if df is not None]
+        if not frames:
+            return pd.DataFrame(columns=codes)
+        return pd.concat(frames, axis=1, sort=True)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 소스별 서킷 브레이커 (장애 시 백오프 동안 업스트림 호출 차단)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+BREAKER_FAILURE_THRESHOLD = 3     # 연속 실패 N회 → 차단
+BREAKER_BASE_BACKOFF_SEC = 60     # 첫 차단 시간, 재시도 실패 시마다 2배
+BREAKER_MAX_BACKOFF_SEC = 1800
+SOURCE_LABELS = {"yahoo": "Yahoo Finance", "news": "Yahoo 뉴스", "fred": "FRED"}
+
+
+class CircuitOpenError(Exception):
+    """차단 중인 소스 호출 — 업스트림에 요청하지 않고 즉시 실패"""
+
+
+class CircuitBreaker:
+    """closed → (연속 실패) open → (백오프 경과) half-open: 호출 하나만 시험 통과, 나머지는 계속 차단
+    → 시험 성공 시 closed / 실패 시 백오프 2배로 다시 open"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._backoff = BREAKER_BASE_BACKOFF_SEC
+        self._open_until = 0.0
+        self._trial = False   # half-open 시험 호출 진행 중
+
+    @property
+    def is_open(self):
+        return self._trial or time.monotonic() < self._open_until
+
+    def call(self, fn, *args):
+        with self._lock:
+            remaining = self._open_until - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{SOURCE_LABELS[self.name]} 일시 차단 중 ({remaining:.0f}초 후 재시도)")
+            trial = self._failures >= BREAKER_FAILURE_THRESHOLD
+            if trial:
+                if self._trial:
+                    raise CircuitOpenError(f"{SOURCE_LABELS[self.name]} 복구 확인 중 (다른 요청이 재시도 중)")
+                self._trial = True
+        try:
+            result = fn(*args)
+        except Exception:
+            self._record_failure(trial)
+            raise
+        except BaseException:
+            if trial:
+                with self._lock:
+                    self._trial = False
+            raise
+        with self._lock:
+            self._failures = 0
+            self._backoff = BREAKER_BASE_BACKOFF_SEC
+            if trial:
+                self._trial = False
+        return result
+
+    def _record_failure(self, trial=False):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= BREAKER_FAILURE_THRESHOLD:
+                self._open_until = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, BREAKER_MAX_BACKOFF_SEC)
+            if trial:
+                self._trial = False
+
+
+@st.cache_resource
+def get_breakers():
+    return {name: CircuitBreaker(name) for name in SOURCE_LABELS}
+
+
+class EmptyResponseError(Exception):
+    """업스트림이 예외 없이 빈 응답을 돌려준 경우 (yfinance는 실패를 빈 DataFrame으로 반환)"""
+
+
+class GuardedMarketProvider(MarketDataProvider):
+    """시세는 yahoo, 뉴스는 news 브레이커를 거쳐 호출하고 빈 응답도 실패로 집계"""
+
+    def __init__(self, inner, breakers):
+        self.inner = inner
+        self.breakers = breakers
+
+    def _checked(self, fn, *args):
+        result = fn(*args)
+        if result is None or result.empty or result.isna().all().all():
+            raise EmptyResponseError("빈 응답")
+        return result
+
+    def ohlc(self, ticker, start, end):
+        return self.breakers["yahoo"].call(self._checked, self.inner.ohlc, ticker, start, end)
+
+    def close_panel(self, tickers, start, end):
+        return self.breakers["yahoo"].call(self._checked, self.inner.close_panel, tickers, start, end)
+
+    def news(self, ticker):
+        return self.breakers["news"].call(self.inner.news, ticker)
+
+
+class GuardedMacroProvider(MacroDataProvider):
+    def __init__(self, inner, breakers):
+        self.inner = inner
+        self.breakers = breakers
+
+    def series(self, codes, start, end):
+        return self.breakers["fred"].call(self.inner.series, codes, start, end)
+
+
+@st.cache_resource
+def get_market_provider():
+    inner = LocalFileProvider(FIXTURE_DIR) if DATA_SOURCE == "offline" else YahooProvider()
+    return GuardedMarketProvider(inner, get_breakers())
+
+
+@st.cache_resource
+def get_macro_provider():
+    inner = LocalFileProvider(FIXTURE_DIR) if DATA_SOURCE == "offline" else FredProvider()
+    return GuardedMacroProvider(inner, get_breakers())
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 로컬 히스토리 저장소 (시리즈별 Parquet + 증분 fetch)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+HISTORY_DIR = Path(os.environ.get("MYQUANT_HISTORY_DIR", Path(__file__).parent / ".cache" / "history"))
+HISTORY_YEARS = 27
+# 마지막 저장일 이전 N일은 다시 받아 덮어씀 (FRED 수정치·NBER 침체 판정 지연, 야후 종가 정정 반영)
+HISTORY_OVERLAP_DAYS = {"fred": 400, "yahoo": 10, "yahoo_close": 10, "sentiment": 10}
+# 다중 시리즈 요청: 시작일이 이 기간 안에 모인 시리즈끼리만 한 번에 받음 (월간·분기 지표 발표 지연 흡수)
+HISTORY_GROUP_DAYS = 120
+
+
+def _history_path(source, key):
+    return HISTORY_DIR / source / f"{_safe_key(key)}.parquet"
+
+
+def read_history(source, key):
+    """저장된 시리즈 히스토리 로드 (없거나 손상 시 None)"""
+    path = _history_path(source, key)
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return None
+
+
+def write_history(source, key, df):
+    """임시 파일에 쓴 뒤 교체하여 동시 접근 중에도 파일이 깨지지 않도록 저장"""
+    path = _history_path(source, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        pass  # 읽기 전용 파일시스템 등 → 저장 없이 계속 진행
+
+
+def write_news_history(ticker, items):
+    """원본 뉴스 응답을 <저장소>/news/<티커>.json으로 덮어씀 (오프라인 재생용 최근 응답 녹화)"""
+    path = HISTORY_DIR / "news" / f"{_safe_key(ticker)}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(items, fh, ensure_ascii=False, default=str)
+        os.replace(tmp, path)
+    except Exception:
+        pass  # 읽기 전용 파일시스템 등 → 녹화 없이 계속 진행
+
+
+def merge_history(old, new):
+    """new 시작일 이후 구간은 new로 덮어써서 정정된 꼬리 구간을 패치"""
+    if old is None or old.empty:
+        return new.sort_index()
+    if new is None or new.empty:
+        return old
+    head = old[old.index < new.index.min()]
+    return pd.concat([head, new]).sort_index()
+
+
+def _incremental_start(source, cached, full_start):
+    if cached is None or cached.empty:
+        return full_start
+    return max(full_start, cached.index.max() - timedelta(days=HISTORY_OVERLAP_DAYS[source]))
+
+
+def _merge_and_store(source, key, cached, fresh):
+    if fresh is not None and not fresh.empty:
+        merged = merge_history(cached, fresh)
+        if cached is None or not merged.equals(cached):
+            write_history(source, key, merged)
+        return merged
+    return cached if cached is not None else fresh
+
+
+def fetch_incremental(source, key, fetch_fn):
+    """저장소에 있는 마지막 날짜 이후(+정정 구간)만 받아 병합.
+    저장소가 비어 있으면 전체 기간을 받아 초기화."""
+    end_dt = datetime.now()
+    full_start = end_dt - timedelta(days=365 * HISTORY_YEARS)
+    cached = read_history(source, key)
+    start = _incremental_start(source, cached, full_start)
+
+    merged = _merge_and_store(source, key, cached, fetch_fn(start, end_dt))
+    if merged is None or merged.empty:
+        return merged
+    return merged[merged.index >= pd.to_datetime(full_start)]
+
+
+def fetch_incremental_columns(source, keys, fetch_fn, full_start=None):
+    """열 = 시리즈 ID인 응답을 받아 시리즈별 저장소에 나눠 병합.
+    시리즈별 시작일을 정렬해 HISTORY_GROUP_DAYS 안에 모인 것끼리 묶어 묶음마다 한 번 요청 —
+    새 티커나 오래 멈춘 티커는 자기 시작일로 따로 받고, 나머지까지 먼 과거부터 다시 받지 않음.
+    fetch_fn(keys, start, end), full_start: {키: 저장소가 빈 시리즈를 채울 시작일} (없는 키는 HISTORY_YEARS 전)"""
+    end_dt = datetime.now()
+    default_start = end_dt - timedelta(days=365 * HISTORY_YEARS)
+    full_start = {key: (full_start or {}).get(key, default_start) for key in keys}
+    cached = {key: read_history(source, key) for key in keys}
+    groups = []
+    for start, key in sorted((_incremental_start(source, cached[key], full_start[key]), key) for key in keys):
+        if groups and start - groups[-1][1] <= timedelta(days=HISTORY_GROUP_DAYS):
+            groups[-1][0].append(key)
+        else:
+            groups.append(([key], start))
+
+    result = {}
+    for group, start in groups:
+        fresh = fetch_fn(group, start, end_dt)
+        for key in group:
+            fresh_key = fresh[[key]].dropna() if fresh is not None and key in fresh.columns else None
+            merged = _merge_and_store(source, key, cached[key], fresh_key)
+            if merged is not None and not merged.empty:
+                result[key] = merged[merged.index >= pd.to_datetime(full_start[key])]
+    return result
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# FRED 시리즈 레지스트리 (갱신 주기당 1회 일괄 요청, 시리즈 ID별 공유)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+FED_FUNDS_SERIES = "DFF"                  # 실효 연방기금금리
+KR_RATE_SERIES = "IRSTCI01KRM156N"        # 한국 단기금리 (한국은행 기준금리 프록시)
+FRED_SERIES = sorted(
+    {cfg["fred_liq"] for cfg in COUNTRY_CONFIG.values()}
+    | {cfg["fred_rec"] for cfg in COUNTRY_CONFIG.values() if cfg["fred_rec"]}
+    | {FED_FUNDS_SERIES, KR_RATE_SERIES}
+)
+
+
+class FredRegistry:
+    """등록된 FRED 시리즈를 한 번의 DataReader 호출로 받아 시리즈 ID별로 보관.
+    지수·국가가 달라도 같은 시리즈는 같은 사본을 공유하며, 반환값은 읽기 전용으로 취급."""
+
+    def __init__(self, codes, ttl):
+        self.codes = list(codes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._series = {}
+        self._fetched_at = None
+
+    def _refresh(self):
+        fetched = fetch_incremental_columns(
+            "fred", self.codes,
+            lambda codes, start, end: get_macro_provider().series(codes, start, end)
+        )
+        self._series = {code: df[code] for code, df in fetched.items()}
+        self._fetched_at = time.monotonic()
+
+    def series(self, code):
+        # 락 안에서 갱신 → 동시에 들어온 요청은 첫 요청의 결과를 기다렸다가 공유.
+        # 등록된 시리즈가 빈 응답이면 TTL이 지날 때까지 KeyError (매 호출 전체 재요청 방지),
+        # 등록된 적 없는 시리즈만 추가 후 즉시 다시 받음
+        with self._lock:
+            expired = self._fetched_at is None or time.monotonic() - self._fetched_at > self.ttl
+            if code not in self.codes:
+                self.codes.append(code)
+                expired = True
+            if expired:
+                self._refresh()
+        if code not in self._series:
+            raise KeyError(f"FRED 시리즈 {code} 데이터가 비어 있습니다.")
+        return self._series[code]
+
+
+@st.cache_resource
+def get_fred_registry():
+    # 백그라운드 갱신 주기보다 약간 짧게 → 매 주기 첫 소비자가 한 번만 다시 받음
+    return FredRegistry(FRED_SERIES, ttl=REFRESH_CYCLE_SEC - 10)
+
+
+def load_ohlc_history(ticker):
+    """지수 OHLC 히스토리 (로컬 저장소 + 증분 fetch)"""
+    return fetch_incremental("yahoo", ticker, lambda start, end: get_market_provider().ohlc(ticker, start, end))
+
+
+class DataLoadError(Exception):
+    """데이터 로드 실패 — 메시지는 그대로 화면에 표시됨"""
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 증분 롤링 지표 엔진 (Liq_MA · SP_MA · YoY · Corr_90d)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+MA_WINDOW = 10
+YOY_LAG = 252
+CORR_WINDOW = 90
+INDICATOR_COLUMNS = ["Liq_MA", "SP_MA", "Liq_YoY", "SP_YoY", "Corr_90d"]
+INCREMENTAL_MAX_BARS = 500   # 이보다 많이 바뀌면(대규모 정정·콜드 스타트) 전체 재계산
+# MYQUANT_VERIFY_INDICATORS=1 → 증분 결과를 매번 전체 재계산과 대조
+VERIFY_INDICATORS = os.environ.get("MYQUANT_VERIFY_INDICATORS") == "1"
+
+
+class IndicatorMismatchError(DataLoadError):
+    """검증 모드에서 증분 결과가 전체 재계산과 다를 때"""
+
+
+def compute_indicators_full(liq, sp):
+    """기준 구현 — 전 구간 pandas rolling 재계산"""
+    return pd.DataFrame({
+        "Liq_MA": liq.rolling(MA_WINDOW).mean(),
+        "SP_MA": sp.rolling(MA_WINDOW).mean(),
+        "Liq_YoY": liq.pct_change(YOY_LAG) * 100,
+        "SP_YoY": sp.pct_change(YOY_LAG) * 100,
+        "Corr_90d": liq.rolling(CORR_WINDOW).corr(sp),
+    }, index=liq.index)
+
+
+def verify_indicators(result, liq, sp):
+    """증분 결과를 전체 재계산과 대조, 다르면 IndicatorMismatchError.
+    한쪽이 상수인 창의 상관계수는 정의되지 않으므로(pandas는 0/±inf) NaN으로 간주"""
+    full = compute_indicators_full(liq, sp)
+    flat = np.zeros(len(liq), dtype=bool)
+    for x in (liq, sp):
+        roll = x.rolling(CORR_WINDOW)
+        flat |= (roll.max() == roll.min()).to_numpy()
+    for col in INDICATOR_COLUMNS:
+        a = result[col].to_numpy(float)
+        b = full[col].to_numpy(float)
+        if col == "Corr_90d":
+            b = np.where(flat, np.nan, b)
+        a = np.where(np.isfinite(a), a, np.nan)
+        b = np.where(np.isfinite(b), b, np.nan)
+        ok = np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+        if not ok.all():
+            at = result.index[np.argmin(ok)]
+            raise IndicatorMismatchError(
+                f"지표 검증 실패: {col} {at:%Y-%m-%d} 증분={a[np.argmin(ok)]:.10g} 전체={b[np.argmin(ok)]:.10g}"
+            )
+
+
+class _SlidingWindow:
+    """고정 길이 창의 합·제곱합·교차곱을 add/remove로 유지 (막대당 O(1)).
+    NaN은 합에서 빼고 개수만 셈 → 창 안에 NaN이 하나라도 있으면 결과 NaN (pandas min_periods=window와 동일).
+    상쇄 오차를 줄이려고 값은 시드 시점의 기준값(anchor)을 뺀 편차로 누적."""
+
+    def __init__(self, values, anchor):
+        self.ax, self.ay = float(anchor[0]), float(anchor[1])
+        nan = np.isnan(values)
+        d = np.where(nan, 0.0, values - np.asarray(anchor, dtype=float))
+        self.nx, self.ny = (int(v) for v in nan.sum(axis=0))
+        self.sx, self.sy = (float(v) for v in d.sum(axis=0))
+        self.sxx, self.syy = (float(v) for v in (d * d).sum(axis=0))
+        self.sxy = float((d[:, 0] * d[:, 1]).sum())
+
+    def _apply(self, x, y, sign):
+        if x != x:
+            self.nx += sign
+            dx = 0.0
+        else:
+            dx = x - self.ax
+        if y != y:
+            self.ny += sign
+            dy = 0.0
+        else:
+            dy = y - self.ay
+        self.sx += sign * dx
+        self.sy += sign * dy
+        self.sxx += sign * dx * dx
+        self.syy += sign * dy * dy
+        self.sxy += sign * dx * dy
+
+    def add(self, x, y):
+        self._apply(x, y, 1)
+
+    def remove(self, x, y):
+        self._apply(x, y, -1)
+
+    def means(self, n):
+        return (np.nan if self.nx else self.sx / n + self.ax,
+                np.nan if self.ny else self.sy / n + self.ay)
+
+    def corr(self, n):
+        if self.nx or self.ny:
+            return np.nan
+        # pandas Rolling.corr와 같은 식: (E[xy] - E[x]E[y]) · n/(n-1) / sqrt(var_x · var_y)
+        var_x = (self.sxx - self.sx * self.sx / n) / (n - 1)
+        var_y = (self.syy - self.sy * self.sy / n) / (n - 1)
+        if var_x <= 1e-12 * self.sxx / n or var_y <= 1e-12 * self.syy / n:
+            return np.nan   # 상수 구간 — 상관계수 정의 불가 (pandas는 반올림에 따라 0/±inf)
+        cov = (self.sxy / n - (self.sx / n) * (self.sy / n)) * n / (n - 1)
+        return cov / (var_x * var_y) ** 0.5
+
+
+class IndicatorEngine:
+    """직전 입력·결과를 보관하다가, 새 입력이 들어오면 바뀌지 않은 앞부분은 재사용하고
+    달라진 지점(새 막대·FRED 정정)부터만 창을 다시 시드해 한 막대씩 이어 계산.
+    저장소가 27년 창 밖의 앞부분을 잘라내도 타임스탬프로 맞춰 재사용함."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._inputs = None    # (n, 2) [Liquidity, SP500]
+        self._outputs = None   # (n, len(INDICATOR_COLUMNS))
+
+    def update(self, liq, sp):
+        index = liq.index
+        inputs = np.column_stack([liq.to_numpy(float), sp.to_numpy(float)])
+        with self._lock:
+            reuse = self._reusable_prefix(index, inputs)
+            if reuse is None or len(index) - reuse[1] > INCREMENTAL_MAX_BARS:
+                outputs = compute_indicators_full(liq, sp)[INDICATOR_COLUMNS].to_numpy()
+            else:
+                head, start = reuse
+                outputs = np.full((len(index), len(INDICATOR_COLUMNS)), np.nan)
+                outputs[:start] = self._outputs[head:head + start]
+                if head:
+                    _blank_warmup(outputs, start)
+                _extend_indicators(inputs, outputs, start)
+            self._index, self._inputs, self._outputs = index, inputs, outputs
+        result = pd.DataFrame(outputs, index=index, columns=INDICATOR_COLUMNS, copy=True)
+        if VERIFY_INDICATORS:
+            verify_indicators(result, liq, sp)
+        return result
+
+    def _reusable_prefix(self, index, inputs):
+        """(앞에서 잘린 행 수, 재사용 가능한 행 수) — 이어 붙일 수 없으면 None"""
+        if self._index is None or len(index) == 0:
+            return None
+        prev, cur = self._index.asi8, index.asi8
+        head = int(prev.searchsorted(cur[0]))
+        if head >= len(prev) or prev[head] != cur[0]:
+            return None
+        m = min(len(prev) - head, len(cur))
+        old, new = self._inputs[head:head + m], inputs[:m]
+        same = (prev[head:head + m] == cur[:m]) & (
+            (old == new) | (np.isnan(old) & np.isnan(new))
+        ).all(axis=1)
+        return head, (m if same.all() else int(np.argmin(same)))
+
+
+def _blank_warmup(outputs, upto):
+    """앞부분이 잘렸을 때 전체 재계산과 같도록 창이 덜 찬 구간을 NaN으로"""
+    outputs[:min(MA_WINDOW - 1, upto), 0:2] = np.nan
+    outputs[:min(YOY_LAG, upto), 2:4] = np.nan
+    outputs[:min(CORR_WINDOW - 1, upto), 4] = np.nan
+
+
+def _extend_indicators(inputs, outputs, start):
+    """start 행부터 끝까지 막대 단위로 이어 계산 — 창은 start 직전 구간으로 한 번만 시드"""
+    n = len(inputs)
+    if start >= n:
+        return
+    ma_lo, corr_lo = max(0, start - MA_WINDOW), max(0, start - CORR_WINDOW)
+    seed = inputs[corr_lo:start + 1]
+    valid = seed[~np.isnan(seed).any(axis=1)]
+    anchor = valid[0] if len(valid) else np.zeros(2)
+    ma = _SlidingWindow(inputs[ma_lo:start], (0.0, 0.0))
+    cw = _SlidingWindow(inputs[corr_lo:start], anchor)
+    base = max(0, start - YOY_LAG)
+    rows = inputs[base:].tolist()   # 막대 단위 루프는 파이썬 float로 (넘파이 스칼라 연산보다 빠름)
+    for i in range(start, n):
+        x, y = rows[i - base]
+        ma.add(x, y)
+        cw.add(x, y)
+        if i >= MA_WINDOW:
+            ma.remove(*rows[i - MA_WINDOW - base])
+        if i >= CORR_WINDOW:
+            cw.remove(*rows[i - CORR_WINDOW - base])
+        if i >= MA_WINDOW - 1:
+            outputs[i, 0:2] = ma.means(MA_WINDOW)
+        if i >= YOY_LAG:
+            px, py = rows[i - YOY_LAG - base]
+            outputs[i, 2:4] = ((x / px - 1) * 100, (y / py - 1) * 100)
+        if i >= CORR_WINDOW - 1:
+            outputs[i, 4] = cw.corr(CORR_WINDOW)
+
+
+@st.cache_resource
+def get_indicator_engine(ticker, fred_liq, fred_rec, liq_divisor):
+    return IndicatorEngine()
+
+
 def load_data(ticker, fred_liq, fred_rec, liq_divisor):
     try:
         end_dt = datetime.now()
-        fetch_start = end_dt - timedelta(days=365 * 27)
 
         # [A] FRED 데이터 (유동성)
         try:
             fred_codes = [fred_liq]
             if fred_rec:
                 fred_codes.append(fred_rec)
-            fred_df = web.DataReader(fred_codes, "fred", fetch_start, end_dt).ffill()
+            registry = get_fred_registry()
+            fred_df = pd.concat([registry.series(c) for c in fred_codes], axis=1, sort=True).ffill()
             if fred_rec:
                 fred_df.columns = ["Liquidity", "Recession"]
             else:
@@ -615,191 +1293,525 @@ def load_data(ticker, fred_liq, fred_rec, liq_divisor):
                 fred_df["Recession"] = 0
             fred_df["Liquidity"] = fred_df["Liquidity"] / liq_divisor
         except Exception as e:
-            st.error(f"FRED 데이터 로드 실패: {e}")
-            return None, None
+            raise DataLoadError(f"FRED 데이터 로드 실패: {e}") from e
 
         # [B] 주가 지수 데이터 (yfinance - OHLC)
         try:
-            import yfinance as yf
-
-            # 방법 1: yf.download (auto_adjust=False, multi_level_index=False)
-            try:
-                yf_data = yf.download(
-                    ticker, start=fetch_start, end=end_dt,
-                    progress=False, auto_adjust=False, multi_level_index=False
-                )
-            except TypeError:
-                # 구버전 yfinance: multi_level_index 미지원
-                yf_data = yf.download(
-                    ticker, start=fetch_start, end=end_dt,
-                    progress=False, auto_adjust=False
-                )
-
-            # MultiIndex 컬럼이 남아있으면 평탄화
-            if isinstance(yf_data.columns, pd.MultiIndex):
-                yf_data.columns = [col[0] for col in yf_data.columns]
+            yf_data = load_ohlc_history(ticker)
 
-            # 방법 1 실패 시 → 방법 2: yf.Ticker().history() 폴백
-            if yf_data.empty:
-                t = yf.Ticker(ticker)
-                yf_data = t.history(start=fetch_start, end=end_dt, auto_adjust=False)
-                if isinstance(yf_data.columns, pd.MultiIndex):
-                    yf_data.columns = [col[0] for col in yf_data.columns]
-
-            if yf_data.empty:
-                st.error("지수 데이터를 가져오지 못했습니다. (데이터가 비어있음)")
-                return None, None
+            if yf_data is None or yf_data.empty:
+                raise DataLoadError("지수 데이터를 가져오지 못했습니다. (데이터가 비어있음)")
 
             idx_close = yf_data[['Close']].rename(columns={'Close': 'SP500'})
             ohlc = yf_data[['Open','High','Low','Close','Volume']].copy()
 
+        except DataLoadError:
+            raise
         except Exception as e:
-            st.error(f"지수 데이터 로드 실패 (yfinance): {e}")
-            return None, None
+            raise DataLoadError(f"지수 데이터 로드 실패 (yfinance): {e}") from e
 
         # [C] 데이터 통합 및 가공
-        df = pd.concat([fred_df, idx_close], axis=1).ffill()
+        df = pd.concat([fred_df, idx_close], axis=1, sort=True).ffill()
         
         if 'SP500' in df.columns:
-            df["Liq_MA"] = df["Liquidity"].rolling(10).mean()
-            df["SP_MA"] = df["SP500"].rolling(10).mean()
-            df["Liq_YoY"] = df["Liquidity"].pct_change(252) * 100
-            df["SP_YoY"] = df["SP500"].pct_change(252) * 100
+            engine = get_indicator_engine(ticker, fred_liq, fred_rec, liq_divisor)
+            indicators = engine.update(df["Liquidity"], df["SP500"])
+            df[["Liq_MA", "SP_MA", "Liq_YoY", "SP_YoY"]] = indicators[["Liq_MA", "SP_MA", "Liq_YoY", "SP_YoY"]]
         else:
-            st.error("데이터 통합 과정에서 주가 컬럼을 생성하지 못했습니다.")
-            return None, None
+            raise DataLoadError("데이터 통합 과정에서 주가 컬럼을 생성하지 못했습니다.")
 
         for c in ["Liquidity", "SP500"]:
             s = df[c].dropna()
             if len(s) > 0:
                 df[f"{c}_norm"] = (df[c] - s.min()) / (s.max() - s.min()) * 100
         
-        df["Corr_90d"] = df["Liquidity"].rolling(90).corr(df["SP500"])
+        df["Corr_90d"] = indicators["Corr_90d"]
 
         cut = end_dt - timedelta(days=365 * 27)
         df = df[df.index >= pd.to_datetime(cut)]
         ohlc = ohlc[ohlc.index >= pd.to_datetime(cut)]
         return df.dropna(subset=["SP500"]), ohlc.dropna(subset=["Close"])
 
+    except DataLoadError:
+        raise
     except Exception as e:
-        st.error(f"⚠️ 시스템 오류: {str(e)}")
-        return None, None
+        raise DataLoadError(f"⚠️ 시스템 오류: {str(e)}") from e
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# As-of 정렬 (정렬된 날짜 축에 보조 시계열·이벤트를 O(n log m)로 맞춤)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+def _as_ns(dates):
+    """날짜 목록/인덱스 → datetime64[ns] 배열 (pandas 해상도 차이 제거)"""
+    return np.asarray(pd.DatetimeIndex(dates), dtype="datetime64[ns]")
+
+
+def asof_positions(axis, dates):
+    """각 날짜 이하에서 가장 가까운 축 위치 (축 시작 이전이면 -1). axis는 오름차순"""
+    return np.searchsorted(_as_ns(axis), _as_ns(dates), side="right") - 1
+
+
+def align_asof(axis, series):
+    """series(오름차순 날짜 인덱스)를 axis 날짜 기준 as-of 값으로 — 이전 값이 없으면 NaN"""
+    pos = asof_positions(series.index, axis)
+    values = series.to_numpy(float)
+    return np.where(pos >= 0, values[np.maximum(pos, 0)], np.nan) if len(values) else np.full(len(pos), np.nan)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 차트용 일봉 (갱신당 1회 생성 — 주·월봉 묶음과 이동평균은 브라우저에서)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+DEFAULT_TIMEFRAME = "주봉"                          # 일·주·월봉은 차트 안 버튼으로 전환 (서버 재실행 없음)
+MARKER_GAP_BARS = {"일봉": 10, "주봉": 4, "월봉": 2}   # 이벤트 마커 최소 간격 (봉 수)
+PERIOD_YEARS = {"3년": 3, "5년": 5, "7년": 7, "10년": 10, "전체": 27}   # 차트·타임라인 기간 선택지
+MA_LENGTHS = (20, 60, 120)
+CHART_MARGIN_DAYS = 180   # 보이는 구간 왼쪽으로 미리 보내 둘 일봉 여유 (스크롤 시 빈 구간 방지)
+
+
+def day_number(ts):
+    """날짜 → 1970-01-01 기준 일수 (차트 컴포넌트와 주고받는 날짜 단위)"""
+    return (pd.Timestamp(ts).normalize() - pd.Timestamp("1970-01-01")).days
+
+
+class DailyOhlc:
+    """지수 하나의 전 기간 일봉과 일봉 날짜에 as-of 정렬한 유동성(Liq_MA).
+    데이터 갱신마다 한 번 만들어 모든 세션이 공유 — 읽기 전용으로 취급하며
+    차트에는 days(일수)로 위치만 찾아 필요한 조각을 잘라 보냄."""
+
+    __slots__ = ("bars", "liq", "days")
+
+    def __init__(self, ohlc, liq):
+        self.bars = ohlc
+        self.liq = align_asof(ohlc.index, liq)
+        self.days = _as_ns(ohlc.index).astype("datetime64[D]").astype(np.int64)
+
+    def position(self, day):
+        """일수 → 그 날 이후 첫 일봉 위치 (정렬된 배열 이진 탐색)"""
+        return int(self.days.searchsorted(day))
+
+
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_daily_ohlc(ticker, snapshot_at, _ohlc, _liq):
+    """(지수, 스냅샷 시각)별로 한 번만 생성 — 원본 프레임은 해시하지 않음"""
+    return DailyOhlc(_ohlc.dropna(subset=["Close"]), _liq.dropna())
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 유동성 → 지수 선행/후행 교차상관 (시차 0~250 거래일, 롤링 창)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+LEAD_LAG_MAX = 250          # 최대 시차 (거래일)
+LEAD_LAG_WINDOW = 756       # 롤링 창 (약 3년)
+LEAD_LAG_HORIZON = 21       # 변화율 기간 (약 1개월)
+LEAD_LAG_STEP = 5           # 표면(시점 × 시차) 샘플 간격 (약 1주)
+LEAD_LAG_MIN_CORR = 0.2     # 이보다 약하면 "선행성 불분명"으로 취급
+
+
+def compute_lead_lag(liq, px, max_lag=LEAD_LAG_MAX, window=LEAD_LAG_WINDOW,
+                     horizon=LEAD_LAG_HORIZON, step=LEAD_LAG_STEP):
+    """유동성 h일 로그 변화(t-k)와 지수 h일 로그 수익률(t)의 상관을 시차 k=0..max_lag, 창 끝 t마다 계산.
+    x·y의 창 합은 1차원 누적합, 교차곱 Σx[s-k]·y[s]는 시차별 누적합 행렬 한 번으로 모든 (t, k)를 차분으로 얻음.
+    데이터가 창 + 최대 시차보다 짧으면 None."""
+    frame = pd.concat([liq, px], axis=1, keys=["liq", "px"], sort=True).dropna()
+    frame = frame[(frame > 0).all(axis=1)]
+    x = np.log(frame["liq"].to_numpy())
+    y = np.log(frame["px"].to_numpy())
+    x, y = x[horizon:] - x[:-horizon], y[horizon:] - y[:-horizon]
+    dates = frame.index[horizon:]
+    n = len(x)
+    if n < window + max_lag:
+        return None
+    # 전체 평균을 빼서 누적합 상쇄 오차를 줄임 (상관계수는 평행이동에 불변)
+    x, y = x - x.mean(), y - y.mean()
+
+    def window_sums(v):
+        c = np.concatenate([[0.0], np.cumsum(v)])
+        return c[window:] - c[:-window]          # [j] = Σ v[j .. j+window-1]
+
+    ends = np.arange(n - 1, window + max_lag - 2, -step)[::-1]   # 창 끝 시점 (마지막 시점 포함)
+    lags = np.arange(max_lag + 1)
+    start_y = ends - window + 1                               # y 창 시작
+    start_x = start_y[:, None] - lags[None, :]                # x 창 시작 (시차만큼 앞)
+    sy, syy = window_sums(y)[start_y][:, None], window_sums(y * y)[start_y][:, None]
+    sx, sxx = window_sums(x)[start_x], window_sums(x * x)[start_x]
+
+    prod = np.zeros((max_lag + 1, n + 1))
+    for k in lags:
+        prod[k, k + 1:] = x[:n - k] * y[k:]
+    np.cumsum(prod, axis=1, out=prod)                         # prod[k, t+1] = Σ_{s≤t} x[s-k]·y[s]
+    sxy = (prod[:, ends + 1] - prod[:, start_y]).T
+
+    cov = sxy - sx * sy / window
+    var = (sxx - sx * sx / window) * (syy - sy * sy / window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        surface = np.where(var > 0, cov / np.sqrt(var), np.nan)
+
+    profile = surface[-1]
+    best = int(np.nanargmax(profile))
+    return {
+        "lags": lags,
+        "dates": dates[ends],
+        "surface": surface,                                   # (시점, 시차)
+        "profile": profile,                                   # 최근 창
+        "best_lag": best,
+        "best_corr": float(profile[best]),
+        "same_day_corr": float(profile[0]),
+        "best_lag_path": pd.Series(np.nanargmax(np.nan_to_num(surface, nan=-np.inf), axis=1), index=dates[ends]),
+    }
+
+
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_lead_lag(ticker, snapshot_at, _df):
+    """(지수, 스냅샷 시각)별 한 번만 계산 — 원본 프레임은 해시하지 않음"""
+    return compute_lead_lag(_df["Liquidity"], _df["SP500"])
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 다중 창 롤링 상관 표면 (30일 ~ 2년, 공유 누적합 한 번)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+CORR_WINDOWS = (30, 60, 90, 180, 252, 504)
+
+
+def compute_corr_surface(liq, sp, windows=CORR_WINDOWS):
+    """유동성-지수 롤링 상관을 여러 창에 대해 한 번에 계산 → 열 Corr_{w}d 프레임.
+    x, y, x², y², xy 누적합을 한 번 만들고 창마다 차분만 하므로 창 수와 무관하게 O(n).
+    pandas rolling(w).corr과 같은 규칙 — 창 안에 결측이 있으면 NaN, 한쪽이 상수인 창도 NaN"""
+    x, y = liq.to_numpy(float), sp.to_numpy(float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    # 창마다 평균을 빼는 대신 전체 평균을 빼서 누적합 상쇄 오차를 줄임 (상관계수는 평행이동에 불변)
+    x = np.where(valid, x - x[valid].mean(), 0.0) if valid.any() else np.zeros_like(x)
+    y = np.where(valid, y - y[valid].mean(), 0.0) if valid.any() else np.zeros_like(y)
+
+    def csum(v):
+        return np.concatenate([[0.0], np.cumsum(v)])
+
+    cx, cy, cxx, cyy, cxy = csum(x), csum(y), csum(x * x), csum(y * y), csum(x * y)
+    c_bad = csum(~valid)
+    # 값이 바뀐 횟수 — 창 안에서 0이면 상수 구간 (누적합 잔차로 생기는 가짜 분산 차단)
+    c_mx = csum(np.r_[False, x[1:] != x[:-1]])
+    c_my = csum(np.r_[False, y[1:] != y[:-1]])
+
+    n = len(x)
+    out = {}
+    for w in windows:
+        col = np.full(n, np.nan)
+        if n >= w:
+            hi, lo = np.arange(w, n + 1), np.arange(0, n - w + 1)   # 창 [lo, hi)
+
+            def win(c):
+                return c[hi] - c[lo]
+
+            sx, sy = win(cx), win(cy)
+            vx = win(cxx) - sx * sx / w
+            vy = win(cyy) - sy * sy / w
+            cov = win(cxy) - sx * sy / w
+            # 창 첫 점의 변화 여부는 창 밖 값과의 비교이므로 제외
+            moved_x = c_mx[hi] - c_mx[lo + 1]
+            moved_y = c_my[hi] - c_my[lo + 1]
+            ok = (win(c_bad) == 0) & (moved_x > 0) & (moved_y > 0) & (vx > 0) & (vy > 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                col[w - 1:] = np.where(ok, np.clip(cov / np.sqrt(vx * vy), -1.0, 1.0), np.nan)
+        out[f"Corr_{w}d"] = col
+    return pd.DataFrame(out, index=liq.index)
+
+
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_corr_surface(ticker, snapshot_at, _df):
+    """(지수, 스냅샷 시각)별 한 번만 계산 — 재실행마다 추가 연산 없음"""
+    return compute_corr_surface(_df["Liquidity"], _df["SP500"])
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 유동성 레짐 (전 구간 4단계 분류 + 레짐별 이후 지수 수익률 분포)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+LIQ_REGIMES = (   # (이름, 색) — 순서가 레짐 번호 0~3
+    ("적극적 확장 (Active Expansion)", "#16a34a"),
+    ("완만한 확장 (Moderate Expansion)", "#65a30d"),
+    ("보합/초기 수축 (Neutral/Early Contraction)", "#ca8a04"),
+    ("적극적 수축 (Active Contraction)", "#dc2626"),
+)
+FORWARD_HORIZONS = {"1M": 21, "3M": 63, "6M": 126}   # 이후 수익률 기간 (거래일)
+
+
+def classify_liq_regime(liq_1m_chg, liq_3m_chg):
+    """유동성 1·3개월 변화율(%) → 레짐 번호 0~3 (LIQ_REGIMES 순서).
+    스칼라·배열 모두 받음 — 최신 봉 판정과 전 구간 분류가 같은 규칙을 씀. 결측은 -1"""
+    m1, m3 = np.asarray(liq_1m_chg, dtype=float), np.asarray(liq_3m_chg, dtype=float)
+    code = np.select(
+        [np.isnan(m1) | np.isnan(m3),
+         (m3 > 2) & (m1 > 0),
+         (m3 > 0) & (m1 >= -0.5),
+         (m3 > -2) & (m3 <= 0)],
+        [-1, 0, 1, 2],
+        default=3,
+    )
+    return int(code) if code.ndim == 0 else code
+
+
+def compute_liq_regimes(liq, px):
+    """전 구간 레짐 분류와 레짐별 이후 1M/3M/6M 지수 수익률(%) 통계.
+    변화율은 브리프와 같은 정의 — 1개월 = 20봉 전, 3개월 = 62봉 전 대비.
+    이후 수익률은 매일 겹쳐 세므로 표본 수(n)는 거래일 수, 독립 표본 수는 에피소드 수로 봄"""
+    frame = pd.concat([liq, px], axis=1, keys=["liq", "px"], sort=True).dropna()
+    codes = pd.Series(
+        classify_liq_regime(frame["liq"].pct_change(20) * 100, frame["liq"].pct_change(62) * 100),
+        index=frame.index, dtype="int8",
+    )
+    fwd = pd.DataFrame({k: (frame["px"].shift(-h) / frame["px"] - 1) * 100 for k, h in FORWARD_HORIZONS.items()})
+    long = (fwd.assign(regime=codes)[codes >= 0]
+            .melt(id_vars="regime", var_name="horizon", value_name="ret").dropna())
+    long["up"] = (long["ret"] > 0) * 100.0
+    g = long.groupby(["regime", "horizon"])
+    stats = pd.DataFrame({
+        "n": g["ret"].size(),
+        "mean": g["ret"].mean(),
+        "median": g["ret"].median(),
+        "p10": g["ret"].quantile(0.1),
+        "p90": g["ret"].quantile(0.9),
+        "hit": g["up"].mean(),
+    })
+    baseline = long.groupby("horizon").agg(median=("ret", "median"), hit=("up", "mean"))
+    run_starts = codes.ne(codes.shift())
+    return {
+        "codes": codes,
+        "stats": stats,                                          # (레짐, 기간) → n·mean·median·p10·p90·hit
+        "baseline": baseline,                                    # 기간 → 전 구간 median·hit
+        "episodes": run_starts[codes >= 0].groupby(codes[codes >= 0]).sum(),
+        "since": frame.index[0],
+    }
+
+
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_liq_regimes(ticker, snapshot_at, _df):
+    """(지수, 스냅샷 시각)별 한 번만 계산 — 재실행마다 분류·통계 루프 없음"""
+    return compute_liq_regimes(_df["Liquidity"], _df["SP500"])
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 차트 컴포넌트 (양방향: 인자 = 옵션 + 일봉 조각, 값 = 불러온 구간·보이는 구간)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+lw_chart = components.declare_component("lw_chart", path=str(Path(__file__).parent / "chart_component"))
+
+
+def _b64(values, dtype):
+    """배열 → 리틀엔디언 typed array 바이트의 base64 (JS에서 Float32Array/Int32Array로 복원)"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()).decode("ascii")
+
+
+def chart_chunk(daily, snap, base_at=None, at=None, stop=None, regime_codes=None, regime_at=0):
+    """차트에 보낼 일봉 조각 하나 (열 단위 typed array를 base64로, 위치는 전 기간 일봉 번호).
+    id가 같은 조각은 브라우저가 한 번만 적용하므로 재실행마다 같은 조각을 다시 보내도 무해.
+    - base_at: 날짜·종가를 이 위치부터 끝까지 교체 (이동평균용이라 전 기간, 일수는 차분 Int32)
+    - at~stop: 시가·고가·저가·거래량·유동성 (Float32, 결측 NaN) — 보이는 구간 근처만
+    - regime_codes: 일봉별 레짐 번호 Int8 (-1 = 없음), regime_at부터"""
+    chunk = {"id": f"{snap}:{base_at}:{at}:{stop}:{regime_at if regime_codes is not None else None}", "snap": snap}
+    if base_at is not None:
+        chunk.update(
+            base_at=base_at,
+            days=_b64(np.diff(daily.days[base_at:], prepend=0), "i4"),
+            close=_b64(np.round(daily.bars["Close"].to_numpy(float)[base_at:], 2), "f4"),
+        )
+    if at is not None:
+        bars = daily.bars.iloc[at:stop]
+        col = lambda name: _b64(np.round(bars[name].to_numpy(float), 2), "f4")
+        chunk.update(
+            at=at,
+            open=col("Open"), high=col("High"), low=col("Low"),
+            volume=_b64(np.nan_to_num(bars["Volume"].to_numpy(float)), "f4"),
+            liq=_b64(np.round(daily.liq[at:stop], 2), "f4"),
+        )
+    if regime_codes is not None:
+        chunk.update(regime_at=regime_at, regime=_b64(regime_codes[regime_at:], "i1"))
+    return chunk
+
+
+def first_changed_bar(old, new, old_regimes=None, new_regimes=None):
+    """이전 스냅샷 일봉(old)과 지금 일봉(new)이 처음 달라지는 위치 (old 범위까지 같으면 그 길이).
+    야후 정정(HISTORY_OVERLAP_DAYS 재수신)·유동성 주간 발표가 끝 봉보다 앞쪽 값도 바꾸므로 전 구간 비교"""
+    n = min(len(old.days), len(new.days))
+    same_values = lambda a, b: (a == b) | (np.isnan(a) & np.isnan(b))
+    same = old.days[:n] == new.days[:n]
+    for name in ("Open", "High", "Low", "Close", "Volume"):
+        same &= same_values(old.bars[name].to_numpy(float)[:n], new.bars[name].to_numpy(float)[:n])
+    same &= same_values(old.liq[:n], new.liq[:n])
+    if old_regimes is not None and new_regimes is not None:
+        same &= old_regimes[:n] == new_regimes[:n]
+    changed = np.flatnonzero(~same)
+    return int(changed[0]) if len(changed) else n
+
+
+def plan_chart_chunks(daily, snap, have, need_day, regime_codes=None, sent=None):
+    """브라우저가 보고한 상태(have)와 지금 필요한 첫 날짜로 보낼 조각만 계산.
+    sent = 브라우저가 가진 스냅샷(have["snap"])으로 보냈던 (일봉, 레짐) — 스냅샷이 바뀌면 이것과 비교.
+    - 처음·지수 변경·이력 불일치·이전 스냅샷 모름: 전 기간 날짜·종가 + need_day 이후 OHLCV
+    - 스냅샷 변경: 처음 달라진 일봉부터 끝까지 (마지막으로 받은 일봉은 미완성일 수 있어 항상 포함)
+    - 보이는 구간이 불러온 구간 왼쪽 끝에 다가옴: 그 앞쪽 OHLCV만
+    - 레짐을 처음 켬: 전 기간 레짐"""
+    need = daily.position(need_day)
+    old = None
+    if have:
+        old = daily if have["snap"] == snap else (sent[0] if sent else None)
+    hi = old.position(have["hi"]) if old is not None else None
+    if hi is None or hi != have["n"] - 1 or hi >= len(old.days) or old.days[hi] != have["hi"]:
+        return [chart_chunk(daily, snap, base_at=0, at=need, regime_codes=regime_codes)]
+    chunks = []
+    lo = old.position(have["lo"])
+    if old is not daily:
+        base = min(hi, first_changed_bar(old, daily, sent[1], regime_codes))
+        chunks.append(chart_chunk(daily, snap, base_at=base, at=base,
+                                  regime_codes=regime_codes if have["rg"] else None, regime_at=base))
+        lo = min(lo, base)   # base 앞은 두 스냅샷이 같으므로 위치도 같음
+    if need < lo:
+        chunks.append(chart_chunk(daily, snap, at=need, stop=lo))
+    if regime_codes is not None and not have["rg"]:
+        chunks.append(chart_chunk(daily, snap, regime_codes=regime_codes))
+    return chunks
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 크로스에셋 & 매크로 데이터 (Daily Brief / Investment Advice 용)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-@st.cache_data(ttl=300, show_spinner=False)
+CROSS_ASSET_TICKERS = {
+    "gold": "GC=F",        # 금 선물
+    "silver": "SI=F",      # 은 선물
+    "btc": "BTC-USD",      # 비트코인
+    "eth": "ETH-USD",      # 이더리움
+    "us10y": "^TNX",       # 미국 10년물 금리
+    "us2y": "^IRX",        # 미국 2년물 금리 (단기금리 프록시)
+    "dxy": "DX-F",         # 달러 인덱스 (선물)
+    "nikkei": "^N225",     # 니케이
+    "krw": "KRW=X",       # USD/KRW
+    "vix": "^VIX",         # VIX
+    "russell": "^RUT",     # Russell 2000
+    "dow": "^DJI",         # 다우존스
+    "kospi": "^KS11",      # KOSPI
+    "xlk": "XLK",          # 기술 섹터 ETF
+    "xle": "XLE",          # 에너지 섹터 ETF
+    "xlf": "XLF",          # 금융 섹터 ETF
+    "xlv": "XLV",          # 헬스케어 섹터 ETF
+    "xlu": "XLU",          # 유틸리티 섹터 ETF
+    "tlt": "TLT",          # 장기국채 ETF
+    "hyg": "HYG",          # 하이일드 채권 ETF
+    "oil": "CL=F",         # WTI 원유 선물
+    "copper": "HG=F",      # 구리 선물
+}
+
+
+def compute_change_metrics(close, year_start):
+    """wide 종가 패널 → 열별 현재가·고점·기간 변동률 (NumPy 일괄 계산).
+    열마다 휴장일(NaN) 패턴이 달라서 유효값을 열 하단으로 모은 뒤 iloc[-k]를 행 단위로 참조."""
+    arr = close.to_numpy(dtype=float)
+    n_rows, n_cols = arr.shape
+    valid = ~np.isnan(arr)
+    counts = valid.sum(axis=0)
+    # 안정 정렬: NaN 행이 위로, 유효값은 원래 순서 그대로 아래로 모임
+    order = np.argsort(valid, axis=0, kind="stable")
+    packed = np.take_along_axis(arr, order, axis=0)
+
+    metrics = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current = packed[-1] if n_rows else np.full(n_cols, np.nan)
+        # (지표, iloc[-k], 필요한 최소 길이 초과 조건) — 기존 티커별 계산과 동일한 경계
+        for name, k, min_len in (("chg_1d", 2, 1), ("chg_1w", 5, 5), ("chg_1m", 21, 21), ("chg_3m", 63, 63)):
+            chg = np.zeros(n_cols)
+            if n_rows >= k:
+                ok = counts > min_len
+                chg[ok] = (current[ok] / packed[-k][ok] - 1) * 100
+            metrics[name] = chg
+
+        high_1y = np.max(np.where(valid, arr, -np.inf), axis=0) if n_rows else np.full(n_cols, np.nan)
+        metrics["chg_from_high"] = np.where(high_1y > 0, (current / high_1y - 1) * 100, 0.0)
+
+        ytd_rows = arr[close.index >= year_start]
+        ytd_valid = ~np.isnan(ytd_rows)
+        chg_ytd = np.zeros(n_cols)
+        if len(ytd_rows):
+            has_ytd = ytd_valid.any(axis=0)
+            first = ytd_rows[ytd_valid.argmax(axis=0), np.arange(n_cols)]
+            chg_ytd[has_ytd] = (current[has_ytd] / first[has_ytd] - 1) * 100
+        metrics["chg_ytd"] = chg_ytd
+
+    result = {}
+    for j, col in enumerate(close.columns):
+        if counts[j] == 0:
+            result[col] = None
+            continue
+        result[col] = {
+            "price": float(current[j]), "high_1y": float(high_1y[j]),
+            "chg_1d": float(metrics["chg_1d"][j]), "chg_1w": float(metrics["chg_1w"][j]),
+            "chg_1m": float(metrics["chg_1m"][j]), "chg_3m": float(metrics["chg_3m"][j]),
+            "chg_ytd": float(metrics["chg_ytd"][j]), "chg_from_high": float(metrics["chg_from_high"][j]),
+        }
+    return result
+
+
 def load_cross_asset_data():
     """금, 은, BTC, ETH, 10Y 국채, DXY, 니케이, 원/달러 등 크로스에셋 실시간 데이터"""
-    import yfinance as yf
     end_dt = datetime.now()
-    start_6m = end_dt - timedelta(days=180)
     start_1y = end_dt - timedelta(days=365)
 
-    tickers = {
-        "gold": "GC=F",        # 금 선물
-        "silver": "SI=F",      # 은 선물
-        "btc": "BTC-USD",      # 비트코인
-        "eth": "ETH-USD",      # 이더리움
-        "us10y": "^TNX",       # 미국 10년물 금리
-        "us2y": "^IRX",        # 미국 2년물 금리 (단기금리 프록시)
-        "dxy": "DX-F",         # 달러 인덱스 (선물)
-        "nikkei": "^N225",     # 니케이
-        "krw": "KRW=X",       # USD/KRW
-        "vix": "^VIX",         # VIX
-        "russell": "^RUT",     # Russell 2000
-        "dow": "^DJI",         # 다우존스
-        "kospi": "^KS11",      # KOSPI
-        "xlk": "XLK",          # 기술 섹터 ETF
-        "xle": "XLE",          # 에너지 섹터 ETF
-        "xlf": "XLF",          # 금융 섹터 ETF
-        "xlv": "XLV",          # 헬스케어 섹터 ETF
-        "xlu": "XLU",          # 유틸리티 섹터 ETF
-        "tlt": "TLT",          # 장기국채 ETF
-        "hyg": "HYG",          # 하이일드 채권 ETF
-        "oil": "CL=F",         # WTI 원유 선물
-        "copper": "HG=F",      # 구리 선물
-    }
-
-    result = {}
-    for name, ticker in tickers.items():
-        try:
-            data = yf.download(ticker, start=start_1y, end=end_dt, progress=False, auto_adjust=False)
-            if isinstance(data.columns, pd.MultiIndex):
-                data.columns = [col[0] for col in data.columns]
-            if not data.empty:
-                close = data["Close"].dropna()
-                current = close.iloc[-1]
-                # 고점 (1년 내)
-                high_1y = close.max()
-                # 변동률 계산
-                chg_1d = ((close.iloc[-1] / close.iloc[-2] - 1) * 100) if len(close) > 1 else 0
-                chg_1w = ((close.iloc[-1] / close.iloc[-5] - 1) * 100) if len(close) > 5 else 0
-                chg_1m = ((close.iloc[-1] / close.iloc[-21] - 1) * 100) if len(close) > 21 else 0
-                chg_3m = ((close.iloc[-1] / close.iloc[-63] - 1) * 100) if len(close) > 63 else 0
-                chg_ytd = 0
-                try:
-                    yr_start = close[close.index >= f"{end_dt.year}-01-01"]
-                    if len(yr_start) > 0:
-                        chg_ytd = ((close.iloc[-1] / yr_start.iloc[0] - 1) * 100)
-                except Exception:
-                    pass
-                chg_from_high = ((current / high_1y - 1) * 100) if high_1y > 0 else 0
-                result[name] = {
-                    "price": float(current), "high_1y": float(high_1y),
-                    "chg_1d": float(chg_1d), "chg_1w": float(chg_1w),
-                    "chg_1m": float(chg_1m), "chg_3m": float(chg_3m),
-                    "chg_ytd": float(chg_ytd), "chg_from_high": float(chg_from_high),
-                }
-        except Exception:
-            result[name] = None
-    return result
+    tickers = list(CROSS_ASSET_TICKERS.values())
+    # 종가 패널은 티커별 저장소에 누적, 요청은 마지막 저장일 이후만. 빈 저장소는 패널 창(1년)만 채우고
+    # 센티먼트 입력(VIX·금·HYG)만 전 구간 백테스트용으로 HISTORY_YEARS 전부터.
+    # 일괄 요청 자체가 실패하면 예외 전파 → 스냅샷 저장소가 마지막 정상값으로 대체
+    sentiment_inputs = {CROSS_ASSET_TICKERS[name] for name in SENTIMENT_PANEL}
+    stored = fetch_incremental_columns(
+        "yahoo_close", tickers, lambda keys, start, end: get_market_provider().close_panel(keys, start, end),
+        full_start={ticker: start_1y for ticker in tickers if ticker not in sentiment_inputs},
+    )
+    if not stored:
+        raise EmptyResponseError("크로스에셋 종가 패널이 비어 있음")
+    close = pd.concat(stored.values(), axis=1, sort=True)
+    close = close[close.index >= pd.to_datetime(start_1y)]
+    by_ticker = compute_change_metrics(close, pd.Timestamp(f"{end_dt.year}-01-01"))
+    return {name: by_ticker.get(ticker) for name, ticker in CROSS_ASSET_TICKERS.items()}
 
 
-@st.cache_data(ttl=300, show_spinner=False)
 def load_fed_funds_rate():
-    """FRED에서 실효 연방기금금리(DFF) 로드"""
+    """실효 연방기금금리(DFF) — FRED 레지스트리 공유 사본에서 최근 1년 추출"""
     try:
-        end_dt = datetime.now()
-        start_dt = end_dt - timedelta(days=365)
-        ff = web.DataReader("DFF", "fred", start_dt, end_dt).ffill()
-        current = ff.iloc[-1, 0]
-        prev_month = ff.iloc[-21, 0] if len(ff) > 21 else current
+        start_dt = datetime.now() - timedelta(days=365)
+        ff = get_fred_registry().series(FED_FUNDS_SERIES)
+        ff = ff[ff.index >= pd.to_datetime(start_dt)].ffill()
+        current = ff.iloc[-1]
+        # DFF는 주말 포함 일별 → 행 수가 아니라 달력 기준 한 달 전 값 (as-of)
+        prev_month = align_asof([ff.index[-1] - pd.DateOffset(months=1)], ff)[0]
+        if np.isnan(prev_month):
+            prev_month = current
         return {"current": float(current), "prev_month": float(prev_month)}
     except Exception:
         return None
 
 
-@st.cache_data(ttl=300, show_spinner=False)
 def load_bok_base_rate():
-    """한국은행 기준금리 프록시 — FRED IRSTCI01KRM156N (한국 단기금리)"""
+    """한국은행 기준금리 프록시 — FRED IRSTCI01KRM156N (한국 단기금리), 레지스트리 공유 사본 사용"""
     try:
-        end_dt = datetime.now()
-        start_dt = end_dt - timedelta(days=730)
-        kr = web.DataReader("IRSTCI01KRM156N", "fred", start_dt, end_dt).ffill()
-        current = kr.iloc[-1, 0]
+        start_dt = datetime.now() - timedelta(days=730)
+        kr = get_fred_registry().series(KR_RATE_SERIES)
+        kr = kr[kr.index >= pd.to_datetime(start_dt)].ffill()
+        current = kr.iloc[-1]
         return {"current": float(current)}
     except Exception:
         return None
 
 
-@st.cache_data(ttl=300, show_spinner=False)
 def load_market_news():
     """yfinance를 활용한 주요 시장 관련 뉴스 수집"""
-    import yfinance as yf
+    provider = get_market_provider()
     news_items = []
     # 주요 지수/자산에서 뉴스 수집
     news_tickers = ["^GSPC", "^IXIC", "GC=F", "BTC-USD", "^KS11"]
     seen_titles = set()
+    errors = []
     for ticker_symbol in news_tickers:
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            if hasattr(ticker, 'news') and ticker.news:
-                for item in ticker.news[:5]:
+            items = provider.news(ticker_symbol)
+            if items and DATA_SOURCE != "offline":
+                write_news_history(ticker_symbol, items)
+            if items:
+                for item in items[:5]:
                     content = item.get("content", {})
                     title = content.get("title", "")
-                    provider = content.get("provider", {}).get("displayName", "")
+                    publisher = content.get("provider", {}).get("displayName", "")
                     pub_date = content.get("pubDate", "")
                     canonical_url = content.get("canonicalUrl", {}).get("url", "")
                     # 중복 제거
@@ -807,72 +1819,566 @@ def load_market_news():
                         seen_titles.add(title)
                         news_items.append({
                             "title": title,
-                            "publisher": provider,
+                            "publisher": publisher,
                             "link": canonical_url,
                             "published": pub_date,
                             "ticker": ticker_symbol,
                         })
-        except Exception:
+        except Exception as e:
+            errors.append(e)
             continue
+    if len(errors) == len(news_tickers):
+        raise errors[-1]
     # 최신 순 정렬 후 상위 10개
     return news_items[:10]
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 데이터 로딩 오케스트레이터 (병렬 실행 + 로더별 타임아웃)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+LOADER_TIMEOUTS = {"market": 60, "cross": 30, "fed": 20, "bok": 20, "news": 8}  # 초
+
+
+@st.cache_resource
+def _get_loader_pool():
+    """프로세스 전역 로더 스레드 풀 (세션 간 공유)"""
+    return ThreadPoolExecutor(max_workers=16, thread_name_prefix="loader")
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Single-flight: 같은 키의 동시 fetch를 하나로 합침 (세션·워커 프로세스 간)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+SHARED_SNAPSHOT_DIR = HISTORY_DIR.parent / "snapshots"
+LOCK_DIR = HISTORY_DIR.parent / "locks"
+SHARED_SNAPSHOT_MAX_AGE = REFRESH_LEAD_SEC  # 다른 프로세스가 이 시간 안에 받은 결과는 재사용
+
+
+@contextmanager
+def _file_lock(path):
+    """호스트 내 프로세스 간 배타 락 (fcntl 미지원 환경에서는 프로세스 내 합치기만 적용)"""
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _encode_snapshot(value, frames):
+    """스냅샷 값 → JSON 구조. DataFrame은 frames에 모으고 번호만, 튜플은 표시해 두었다가 복원"""
+    if isinstance(value, pd.DataFrame):
+        frames.append(value)
+        return {"__frame__": len(frames) - 1}
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode_snapshot(v, frames) for v in value]}
+    if isinstance(value, list):
+        return [_encode_snapshot(v, frames) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode_snapshot(v, frames) for k, v in value.items()}
+    return value
+
+
+def _decode_snapshot(obj, frames):
+    if isinstance(obj, list):
+        return [_decode_snapshot(v, frames) for v in obj]
+    if isinstance(obj, dict):
+        if "__frame__" in obj:
+            return frames[obj["__frame__"]]
+        if "__tuple__" in obj:
+            return tuple(_decode_snapshot(v, frames) for v in obj["__tuple__"])
+        return {k: _decode_snapshot(v, frames) for k, v in obj.items()}
+    return obj
+
+
+def _write_snapshot(path, value):
+    """공유 스냅샷을 zip 하나(JSON 구조 + 표별 Parquet)로 저장 — 피클이 없어 읽을 때 코드가 실행되지 않음.
+    JSON·Parquet로 못 옮기는 값은 예외 → 호출부에서 공유 없이 진행"""
+    frames = []
+    manifest = json.dumps({"value": _encode_snapshot(value, frames), "frames": len(frames)})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with zipfile.ZipFile(tmp, "w") as zf:
+        zf.writestr("value.json", manifest)
+        for i, frame in enumerate(frames):
+            zf.writestr(f"{i}.parquet", frame.to_parquet())
+    os.replace(tmp, path)
+
+
+def _read_snapshot(path):
+    with zipfile.ZipFile(path) as zf:
+        manifest = json.loads(zf.read("value.json"))
+        frames = [pd.read_parquet(io.BytesIO(zf.read(f"{i}.parquet"))) for i in range(manifest["frames"])]
+    return _decode_snapshot(manifest["value"], frames)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.fetched_at = None
+        self.error = None
+
+
+class SingleFlight:
+    """첫 번째 호출(리더)만 실제 fetch를 수행하고, 같은 키로 동시에 들어온
+    호출은 리더의 결과를 기다렸다가 공유. 리더는 파일 락을 잡은 뒤
+    다른 워커 프로세스가 방금 저장한 공유 스냅샷이 있으면 fetch 없이 재사용."""
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn, *args):
+        """(값, fetch 시각 epoch초) 반환"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value, flight.fetched_at
+
+        try:
+            flight.value, flight.fetched_at = self._fetch_shared(key, fn, args)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value, flight.fetched_at
+
+    def _fetch_shared(self, key, fn, args):
+        digest = hashlib.sha1(repr((DATA_SOURCE, key)).encode()).hexdigest()[:16]
+        snap_path = SHARED_SNAPSHOT_DIR / f"{digest}.zip"
+        with _file_lock(LOCK_DIR / f"{digest}.lock"):
+            try:
+                fetched_at = snap_path.stat().st_mtime
+                if time.time() - fetched_at < self.max_age:
+                    return _read_snapshot(snap_path), fetched_at
+            except Exception:
+                pass  # 공유 스냅샷 없음/손상 → 직접 fetch
+
+            error = None
+            try:
+                value = fn(*args)
+            except Exception as e:
+                value, error = None, e
+            if value is None:
+                # 실패 → 나이와 무관하게 마지막 정상 스냅샷으로 대체 (시각은 원래 fetch 시각 유지 → stale 표시)
+                try:
+                    return _read_snapshot(snap_path), snap_path.stat().st_mtime
+                except Exception:
+                    if error is not None:
+                        raise error
+                    return None, time.time()
+            fetched_at = time.time()
+            try:
+                _write_snapshot(snap_path, value)
+            except Exception:
+                pass
+            return value, fetched_at
+
+
+@st.cache_resource
+def get_single_flight():
+    return SingleFlight(SHARED_SNAPSHOT_MAX_AGE)
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 백그라운드 갱신 (stale-while-revalidate 스냅샷 저장소)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+REFRESH_IDLE_SEC = 1800  # 30분간 아무도 읽지 않은 데이터셋은 주기 갱신에서 제외
+
+
+class DatasetRefresher:
+    """데이터셋별 마지막 정상 스냅샷을 프로세스 전역으로 보관.
+    세션은 항상 스냅샷을 즉시 읽고, 백그라운드 스레드가 만료 전에 미리 갱신함.
+    갱신이 실패하거나 None을 반환하면 기존 스냅샷을 그대로 유지."""
+
+    def __init__(self, cycle_sec):
+        self.cycle_sec = cycle_sec
+        self._lock = threading.Lock()
+        self._jobs = {}         # key → (fn, args)
+        self._snapshots = {}    # key → (value, 갱신 시각 KST)
+        self._last_read = {}    # key → monotonic
+        self._in_flight = set()
+        threading.Thread(target=self._run, daemon=True, name="dataset-refresher").start()
+
+    def get(self, key, fn, *args):
+        """스냅샷이 있으면 즉시 반환 (오래됐으면 백그라운드 재검증 예약),
+        없으면(콜드 스타트) 직접 불러와 등록"""
+        with self._lock:
+            self._jobs[key] = (fn, args)
+            self._last_read[key] = time.monotonic()
+            snap = self._snapshots.get(key)
+        if snap is None:
+            return self._refresh(key)
+        age = (datetime.now(ZoneInfo("Asia/Seoul")) - snap[1]).total_seconds()
+        if age > REFRESH_INTERVAL_SEC:
+            threading.Thread(target=self._refresh_quietly, args=(key,), daemon=True).start()
+        return snap[0]
+
+    def fetched_at(self, key):
+        snap = self._snapshots.get(key)
+        return snap[1] if snap else None
+
+    def peek(self, key):
+        """현재 스냅샷 (값, 갱신 시각) 또는 None — 읽기로 집계하지 않아 보조 화면이 읽어도
+        해당 데이터셋이 백그라운드 갱신 대상에 계속 남지 않음 (REFRESH_IDLE_SEC 후 쉼)"""
+        return self._snapshots.get(key)
+
+    def _refresh(self, key):
+        fn, args = self._jobs[key]
+        value, fetched_at = get_single_flight().do(key, fn, *args)
+        if value is not None:
+            with self._lock:
+                self._snapshots[key] = (value, datetime.fromtimestamp(fetched_at, ZoneInfo("Asia/Seoul")))
+        return value
+
+    def _refresh_quietly(self, key):
+        with self._lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+        try:
+            self._refresh(key)
+        except Exception:
+            pass  # 마지막 정상 스냅샷 유지
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def _run(self):
+        while True:
+            time.sleep(self.cycle_sec)
+            now = time.monotonic()
+            with self._lock:
+                keys = [k for k in self._jobs if now - self._last_read.get(k, 0) < REFRESH_IDLE_SEC]
+            for key in keys:
+                self._refresh_quietly(key)
+
+
+@st.cache_resource
+def get_refresher():
+    return DatasetRefresher(REFRESH_CYCLE_SEC)
+
+
+def run_loaders(jobs):
+    """jobs = {이름: (함수, 인자 튜플)}를 동시에 실행하고 결과를 모아 반환.
+    로더마다 LOADER_TIMEOUTS 안에 끝나지 않거나 예외가 나면 결과는 None,
+    실패 사유는 failures에 담김. 각 로더는 DatasetRefresher 스냅샷을 거치므로
+    워밍업 이후에는 즉시 반환되고, 타임아웃된 작업도 백그라운드에서 끝까지 돌아
+    스냅샷을 채우므로 다음 새로고침에서 바로 사용됨."""
+    pool = _get_loader_pool()
+    refresher = get_refresher()
+    started = time.monotonic()
+    futures = {
+        name: pool.submit(refresher.get, (name,) + args, fn, *args)
+        for name, (fn, args) in jobs.items()
+    }
+    results, failures = {}, {}
+    for name, fut in futures.items():
+        remaining = LOADER_TIMEOUTS[name] - (time.monotonic() - started)
+        try:
+            results[name] = fut.result(timeout=max(0.0, remaining))
+        except FutureTimeout:
+            results[name] = None
+            failures[name] = f"{LOADER_TIMEOUTS[name]}초 내 응답 없음"
+        except Exception as e:
+            results[name] = None
+            failures[name] = str(e)
+    return results, failures
+
+
+SENTIMENT_BANDS = (   # (하한, 이름, 색) — 위에서부터 첫 번째로 만족하는 구간
+    (75, "극도의 탐욕 (Extreme Greed)", "#16a34a"),
+    (60, "탐욕 (Greed)", "#65a30d"),
+    (45, "중립 (Neutral)", "#ca8a04"),
+    (30, "공포 (Fear)", "#dc2626"),
+    (-np.inf, "극도의 공포 (Extreme Fear)", "#991b1b"),
+)
+
+
+def sentiment_components(vix, sp_1m_chg, sp_yoy, liq_3m_chg, gold_chg, hyg_chg, corr_val):
+    """7개 구성요소 점수(각 0~100) — 스칼라·배열 모두 받음. VIX가 없으면(≤0) 그 요소는 NaN"""
+    vix = np.asarray(vix, dtype=float)
+    with np.errstate(invalid="ignore"):
+        vix_score = np.where(vix > 0, np.clip(100 - (vix - 12) * 4, 0, 100), np.nan)
+    return [
+        vix_score,                                                   # 1. VIX (낮을수록 Greed)
+        np.clip(50 + np.asarray(sp_1m_chg) * 5, 0, 100),             # 2. 시장 모멘텀 (1개월)
+        np.clip(50 + np.asarray(sp_yoy) * 1.5, 0, 100),              # 3. 지수 YoY
+        np.clip(50 + np.asarray(liq_3m_chg) * 10, 0, 100),           # 4. 유동성 추세
+        np.clip(50 - np.asarray(gold_chg) * 3 + np.asarray(sp_1m_chg) * 3, 0, 100),   # 5. 금 vs 주식
+        np.clip(50 + np.asarray(hyg_chg) * 8, 0, 100),               # 6. 하이일드 (HYG 하락 = 스프레드 확대)
+        np.clip(50 + np.asarray(corr_val) * 40, 0, 100),             # 7. 유동성 장세 여부
+    ]
+
+
+def sentiment_band(score):
+    """점수 → (이름, 색)"""
+    return next((label, color) for floor, label, color in SENTIMENT_BANDS if score >= floor)
+
+
 def compute_market_sentiment(cross, liq_yoy, liq_3m_chg, sp_1m_chg, sp_yoy, corr_val):
     """복합 시장 센티먼트 점수 계산 (0-100 스케일, Fear ↔ Greed)"""
-    scores = []
+    components = sentiment_components(
+        _safe(cross, "vix"), sp_1m_chg, sp_yoy, liq_3m_chg,
+        _safe(cross, "gold", "chg_1m"), _safe(cross, "hyg", "chg_1m"), corr_val,
+    )
+    scores = [float(c) for c in components if not np.isnan(c)]
+    avg_score = sum(scores) / len(scores) if scores else 50
+    label, color = sentiment_band(avg_score)
+    return {"score": round(avg_score, 1), "label": label, "color": color, "components": scores}
 
-    # 1. VIX 기반 (0-100, 낮을수록 Greed)
-    vix = _safe(cross, "vix")
-    if vix > 0:
-        vix_score = max(0, min(100, 100 - (vix - 12) * 4))
-        scores.append(vix_score)
 
-    # 2. 시장 모멘텀 (1개월 변동)
-    mom_score = max(0, min(100, 50 + sp_1m_chg * 5))
-    scores.append(mom_score)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 센티먼트 점수 히스토리 (저장된 크로스에셋 패널로 전 구간 계산, 갱신 시 꼬리만 추가)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+SENTIMENT_VERSION = 1      # 점수 식이 바뀌면 올림 → 저장된 히스토리를 새 키로 다시 계산
+SENTIMENT_LOOKBACK = 63    # 꼬리 계산에 붙이는 과거 행 수 (가장 긴 입력: 유동성 62봉 변화율)
+
+
+def compute_sentiment_history(df, panel):
+    """df(날짜 축: Liquidity·SP500·SP_YoY·Corr_90d) + 종가 패널(열: vix·gold·hyg) → 날짜별 점수.
+    입력 정의는 최신 봉 계산과 동일 — 지수 1개월 = 20봉, 유동성 3개월 = 62봉,
+    금·HYG 1개월 = 각자의 거래일 기준 20봉 변화율을 지수 날짜에 as-of로 맞춤. 결측 입력은 0 (스칼라판의 fallback)"""
+    liq = df["Liquidity"].dropna()
+
+    def panel_col(name, transform):
+        s = panel[name].dropna() if name in panel.columns else pd.Series(dtype=float)
+        return align_asof(df.index, transform(s)) if len(s) else np.full(len(df), np.nan)
+
+    components = sentiment_components(
+        np.nan_to_num(panel_col("vix", lambda s: s), nan=0.0),
+        np.nan_to_num(df["SP500"].pct_change(20).to_numpy() * 100),
+        np.nan_to_num(df["SP_YoY"].to_numpy(float)),
+        np.nan_to_num(align_asof(df.index, liq.pct_change(62) * 100)),
+        np.nan_to_num(panel_col("gold", lambda s: s.pct_change(20) * 100)),
+        np.nan_to_num(panel_col("hyg", lambda s: s.pct_change(20) * 100)),
+        np.nan_to_num(df["Corr_90d"].to_numpy(float)),
+    )
+    return pd.DataFrame({"score": np.nanmean(np.vstack(components), axis=0)}, index=df.index)
+
+
+SENTIMENT_PANEL = ("vix", "gold", "hyg")
+
+
+def load_sentiment_panel():
+    """크로스에셋 로더가 누적한 저장소에서 센티먼트 입력 종가만 읽음 (네트워크 요청 없음).
+    저장소가 비어 있어도(콜드 스타트에 로더 실패) 날짜 인덱스를 가진 빈 패널"""
+    cols = {}
+    for name in SENTIMENT_PANEL:
+        hist = read_history("yahoo_close", CROSS_ASSET_TICKERS[name])
+        if hist is not None and not hist.empty:
+            cols[name] = hist.iloc[:, 0]
+    return pd.DataFrame(cols, index=None if cols else pd.DatetimeIndex([]))
+
+
+def _panel_complete_until(panel):
+    """센티먼트 입력이 모두 들어와 있는 마지막 날짜 (하나라도 없으면 None).
+    이후 날짜의 점수는 빠진·묵은 입력으로 계산된 것이므로 저장하지 않음"""
+    ends = [panel[name].last_valid_index() if name in panel.columns else None for name in SENTIMENT_PANEL]
+    return None if any(end is None for end in ends) else min(ends)
+
+
+def update_sentiment_history(ticker, df, panel):
+    """저장된 점수 뒤에 새 거래일만 계산해 붙임 (마지막 HISTORY_OVERLAP_DAYS["sentiment"]일은 정정 반영 위해 재계산).
+    저장소가 비어 있으면 전 구간 계산. 입력 패널이 끝난 뒤의 점수는 화면에만 쓰고 저장하지 않음
+    → 다음 갱신에서 패널이 채워지면 그 구간부터 다시 계산"""
+    key = f"{ticker}@v{SENTIMENT_VERSION}"
+    cached = read_history("sentiment", key)
+    start = df.index[0] if cached is None or cached.empty else \
+        cached.index.max() - timedelta(days=HISTORY_OVERLAP_DAYS["sentiment"])
+    pos = int(df.index.searchsorted(start))
+    ctx = df.iloc[max(0, pos - SENTIMENT_LOOKBACK):]
+    fresh = compute_sentiment_history(ctx, panel[panel.index >= ctx.index[0] - timedelta(days=120)])
+    fresh = fresh[fresh.index >= start]
+    until = _panel_complete_until(panel)
+    stored = _merge_and_store("sentiment", key, cached,
+                              fresh[fresh.index <= until] if until is not None else None)
+    merged = merge_history(stored, fresh)
+    return merged[merged.index >= df.index[0]]["score"]
+
+
+def summarize_sentiment(score, px):
+    """점수 시계열 → 현재 백분위와 구간별 이후 지수 수익률(%) 백테스트"""
+    score = score.dropna()
+    frame = pd.concat([score, px], axis=1, keys=["score", "px"], sort=True).dropna()
+    fwd = pd.DataFrame({k: (frame["px"].shift(-h) / frame["px"] - 1) * 100 for k, h in FORWARD_HORIZONS.items()})
+    band = pd.Series(
+        np.select([frame["score"] >= floor for floor, _, _ in SENTIMENT_BANDS],
+                  [label for _, label, _ in SENTIMENT_BANDS], default=SENTIMENT_BANDS[-1][1]),
+        index=frame.index,
+    )
+    long = fwd.assign(band=band).melt(id_vars="band", var_name="horizon", value_name="ret").dropna()
+    long["up"] = (long["ret"] > 0) * 100.0
+    g = long.groupby(["band", "horizon"])
+    return {
+        "score": score,
+        "percentile": float((score <= score.iloc[-1]).mean() * 100) if len(score) else np.nan,
+        "backtest": pd.DataFrame({"n": g["ret"].size(), "median": g["ret"].median(), "hit": g["up"].mean()}),
+    }
 
-    # 3. 고점 대비 거리 (S&P500 YoY)
-    yoy_score = max(0, min(100, 50 + sp_yoy * 1.5))
-    scores.append(yoy_score)
 
-    # 4. 유동성 추세
-    liq_score = max(0, min(100, 50 + liq_3m_chg * 10))
-    scores.append(liq_score)
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_sentiment_history(ticker, snapshot_at, cross_snapshot_at, _df):
+    """(지수, 두 스냅샷 시각)별 한 번만 — 저장소 갱신(꼬리 추가) 후 백분위·백테스트 요약"""
+    score = update_sentiment_history(ticker, _df, load_sentiment_panel())
+    return summarize_sentiment(score, _df["SP500"])
 
-    # 5. 안전자산 vs 위험자산 (금 vs 주식)
-    gold_chg = _safe(cross, "gold", "chg_1m")
-    safe_haven_score = max(0, min(100, 50 - gold_chg * 3 + sp_1m_chg * 3))
-    scores.append(safe_haven_score)
 
-    # 6. 하이일드 스프레드 (HYG 변동 - 하락이면 스프레드 확대)
-    hyg_chg = _safe(cross, "hyg", "chg_1m")
-    credit_score = max(0, min(100, 50 + hyg_chg * 8))
-    scores.append(credit_score)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 강세/약세 시그널 룰 (최신 판정과 전 구간 백테스트가 같은 함수 사용)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+STANCE_EXPOSURE = {1: 1.0, 0: 0.5, -1: 0.0}   # 비중 확대 / 중립 / 비중 축소 → 지수 보유 비중
+TRADING_DAYS = 252
+
+
+def signal_counts(corr_val, liq_3m_chg, sp_1m_chg, liq_yoy):
+    """(bullish_count, bearish_count) — 스칼라·배열 모두 받음"""
+    corr_val, liq_3m_chg, sp_1m_chg, liq_yoy = (np.asarray(v, dtype=float)
+                                                 for v in (corr_val, liq_3m_chg, sp_1m_chg, liq_yoy))
+    bullish = ((corr_val > 0.5).astype(int) + (liq_3m_chg > 0) + (sp_1m_chg > 0) + (liq_yoy > 0))
+    bearish = ((corr_val < 0).astype(int) + (liq_3m_chg < -1) + (sp_1m_chg < -3) + (liq_yoy < -2))
+    if bullish.ndim == 0:
+        return int(bullish), int(bearish)
+    return bullish, bearish
+
+
+def signal_stance(bullish_count, bearish_count):
+    """1 = 비중 확대 (강세 3개 이상), -1 = 비중 축소 (약세 2개 이상), 0 = 중립"""
+    stance = np.select([np.asarray(bullish_count) >= 3, np.asarray(bearish_count) >= 2], [1, -1], default=0)
+    return int(stance) if stance.ndim == 0 else stance
+
+
+def _perf(daily_ret):
+    """일간 수익률 → CAGR·최대낙폭(%)"""
+    equity = np.cumprod(1 + daily_ret)
+    years = len(daily_ret) / TRADING_DAYS
+    cagr = (equity[-1] ** (1 / years) - 1) * 100 if years > 0 and equity[-1] > 0 else np.nan
+    mdd = (equity / np.maximum.accumulate(equity) - 1).min() * 100
+    return cagr, mdd
+
+
+def backtest_signal_rules(df):
+    """메인 화면과 같은 입력 정의(상관=Corr_90d, 유동성 3M=62봉, 지수 1M=20봉, 유동성 YoY)로
+    매 거래일 시그널을 판정해, 다음 거래일부터 STANCE_EXPOSURE 비중으로 지수를 보유한 성과를 계산.
+    적중률 = 비중 확대/축소 판정일 중 이후 1개월 수익률 방향이 맞은 비율. 비용·현금 이자·데이터 발표 시차 미반영"""
+    px = df["SP500"]
+    liq = df["Liquidity"].dropna()
+    bullish, bearish = signal_counts(
+        df["Corr_90d"].ffill().fillna(0),
+        align_asof(df.index, liq.pct_change(62) * 100),
+        px.pct_change(20) * 100,
+        df["Liq_YoY"].fillna(0),
+    )
+    stance = signal_stance(bullish, bearish)
+    exposure = np.vectorize(STANCE_EXPOSURE.get, otypes=[float])(stance)
+
+    ret = px.pct_change().fillna(0).to_numpy()
+    strat = np.r_[0.0, exposure[:-1]] * ret               # t일 종가 판정 → t+1일 수익에 적용
+    fwd = (px.shift(-FORWARD_HORIZONS["1M"]) / px - 1).to_numpy()
+    called = (stance != 0) & ~np.isnan(fwd)
+    hits = np.sign(fwd[called]) == stance[called]
+
+    cagr, mdd = _perf(strat)
+    bh_cagr, bh_mdd = _perf(ret)
+    return {
+        "start": df.index[0],
+        "cagr": cagr, "mdd": mdd,
+        "bh_cagr": bh_cagr, "bh_mdd": bh_mdd,
+        "hit_rate": hits.mean() * 100 if len(hits) else np.nan,
+        "turnover": np.abs(np.diff(exposure)).sum() / (len(exposure) / TRADING_DAYS),   # 연간 비중 변경 합
+        "share": {k: float((stance == k).mean() * 100) for k in STANCE_EXPOSURE},        # 판정별 비율(%)
+        "stance": pd.Series(stance, index=df.index, dtype="int8"),
+    }
 
-    # 7. 상관관계 (유동성 장세 여부)
-    corr_score = max(0, min(100, 50 + corr_val * 40))
-    scores.append(corr_score)
 
-    avg_score = sum(scores) / len(scores) if scores else 50
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_signal_backtest(ticker, snapshot_at, _df):
+    """(지수, 스냅샷 시각)별 한 번만 — 데이터 갱신 시에만 다시 계산"""
+    return backtest_signal_rules(_df)
+
+
+def backtest_all_indices():
+    """COUNTRY_CONFIG의 모든 지수 백테스트 — 스냅샷이 있는 지수만 즉시 계산하고,
+    없는 지수는 백그라운드로 불러오기만 예약 (다음 실행에서 표시). 반환: [(국가, 지수명, 결과 또는 None)].
+    스냅샷은 peek으로 읽어 보고 있지 않은 지수가 백그라운드 갱신 주기에 계속 남지 않게 함"""
+    refresher = get_refresher()
+    pool = _get_loader_pool()
+    rows = []
+    for country_name, cfg in COUNTRY_CONFIG.items():
+        for name, ticker in cfg["indices"].items():
+            args = (ticker, cfg["fred_liq"], cfg["fred_rec"], cfg["liq_divisor"])
+            key = ("market",) + args
+            snap = refresher.peek(key)
+            if snap is None:
+                pool.submit(refresher.get, key, load_data, *args)
+                rows.append((country_name, name, None))
+                continue
+            (index_df, _), snapshot_at = snap
+            rows.append((country_name, name, get_signal_backtest(ticker, snapshot_at, index_df)))
+    return rows
 
-    if avg_score >= 75:
-        label = "극도의 탐욕 (Extreme Greed)"
-        color = "#16a34a"
-    elif avg_score >= 60:
-        label = "탐욕 (Greed)"
-        color = "#65a30d"
-    elif avg_score >= 45:
-        label = "중립 (Neutral)"
-        color = "#ca8a04"
-    elif avg_score >= 30:
-        label = "공포 (Fear)"
-        color = "#dc2626"
-    else:
-        label = "극도의 공포 (Extreme Fear)"
-        color = "#991b1b"
 
-    return {"score": round(avg_score, 1), "label": label, "color": color, "components": scores}
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 이벤트 스터디 (이벤트 전후 지수 수익률·유동성 변화, 모든 창 한 번에)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+EVENT_WINDOWS = {"1W": 5, "1M": 21, "3M": 63}   # 이벤트 전후 창 (거래일)
+
+
+def compute_event_study(events, px, liq, windows=EVENT_WINDOWS):
+    """이벤트 목록(MARKET_PIVOTS 형식) × 창별 전후 변화율(%)을 (이벤트, 창) 배열 gather로 한 번에 계산.
+    기준 봉 = 이벤트 날짜 이하 마지막 거래일(as-of) — 장중·휴장일 이벤트의 반응은 '이후' 쪽에 잡힘.
+    열: idx_pre_{창}·idx_post_{창}(지수), liq_pre_{창}·liq_post_{창}(유동성), hit_{창}(이후 방향이 이벤트 방향과 일치).
+    창이 데이터 범위를 벗어나면 NaN"""
+    dates = pd.to_datetime([e[0] for e in events])
+    frame = pd.concat([px, liq], axis=1, keys=["px", "liq"], sort=True).dropna(subset=["px"])
+    values = {"idx": frame["px"].to_numpy(float), "liq": frame["liq"].to_numpy(float)}
+    n = len(frame)
+    base = asof_positions(frame.index, dates)[:, None]          # (E, 1)
+    offsets = np.fromiter(windows.values(), dtype=int)[None, :]  # (1, W)
+
+    out = {}
+    for side, pos in (("pre", base - offsets), ("post", base + offsets)):
+        ok = (base >= 0) & (pos >= 0) & (pos < n)
+        safe_pos, safe_base = np.clip(pos, 0, n - 1), np.clip(base, 0, n - 1)
+        for name, v in values.items():
+            at_base, at_pos = v[safe_base], v[safe_pos]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                chg = (at_pos / at_base - 1) * 100 if side == "post" else (at_base / at_pos - 1) * 100
+            chg = np.where(ok, chg, np.nan)
+            for j, label in enumerate(windows):
+                out[f"{name}_{side}_{label}"] = chg[:, j]
+
+    sign = np.array([1 if e[4] == "up" else -1 for e in events])
+    for label in windows:
+        post = out[f"idx_post_{label}"]
+        out[f"hit_{label}"] = np.where(np.isnan(post), np.nan, (np.sign(post) == sign).astype(float))
+    return pd.DataFrame(out, index=pd.MultiIndex.from_arrays([dates, [e[1] for e in events]], names=["date", "title"]))
+
+
+def country_events(country):
+    """국가 이벤트 목록(날짜순)과 그 날짜 인덱스"""
+    events = sorted(COUNTRY_CONFIG[country]["events"], key=lambda x: x[0])
+    return events, pd.to_datetime([e[0] for e in events])
+
+
+@st.cache_resource(max_entries=2 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def get_event_study(country, ticker, snapshot_at, _df):
+    """(국가 이벤트 목록, 지수, 스냅샷 시각)별 한 번만 — 행 순서는 country_events()와 같은 날짜순"""
+    return compute_event_study(country_events(country)[0], _df["SP500"], _df["Liquidity"])
 
 
 def generate_yield_curve_analysis(cross):
@@ -1028,7 +2534,8 @@ def _chg_color(val):
 
 def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m_chg, liq_6m_chg,
                            sp_val, sp_1w_chg, sp_1m_chg, sp_3m_chg, sp_yoy, corr_val,
-                           idx_name, cross, fed_rate, bok_rate, news_data=None):
+                           idx_name, cross, fed_rate, bok_rate, news_data=None, lead_lag=None,
+                           corr_surface=None, regimes=None, sentiment_history=None):
     """Daily Brief 전체를 실시간 데이터 기반으로 동적 생성 (심층 유동성-지수 분석 + 뉴스 요약 포함)"""
 
     # ── 정책 현황 ──
@@ -1192,18 +2699,37 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
         )
 
     # ── 상관관계 진단 (심층 분석) ──
-    # 유동성-지수 선행/후행 관계 분석
+    # 유동성-지수 선행/후행 관계 분석 (교차상관으로 추정한 선행 시차 사용)
+    lead_span = ""
+    if lead_lag and lead_lag["best_lag"] > 0 and lead_lag["best_corr"] >= LEAD_LAG_MIN_CORR:
+        lead_days = lead_lag["best_lag"]
+        lead_span = f'약 {lead_days}거래일(≈{lead_days / 21:.1f}개월)'
     liq_leads_market = ""
     if liq_3m_chg > 1 and sp_1m_chg > 0:
-        liq_leads_market = "유동성 확장이 시장 상승을 선행하는 전형적 패턴이 확인됩니다. 유동성이 먼저 움직이고 주가가 1~3개월 뒤따르는 구조입니다."
+        liq_leads_market = ("유동성 확장이 시장 상승을 선행하는 전형적 패턴이 확인됩니다. "
+                            + (f"유동성이 먼저 움직이고 주가가 {lead_span} 뒤따르는 구조입니다."
+                               if lead_span else
+                               "다만 최근 3년 데이터에서는 뚜렷한 선행 시차가 추정되지 않아 동행에 가까운 구조입니다."))
     elif liq_3m_chg > 1 and sp_1m_chg < 0:
-        liq_leads_market = "유동성은 확장 중이나 주가가 조정을 받고 있습니다. 역사적으로 이 괴리는 2~4주 내 주가 반등으로 해소되는 경향이 높습니다 (2019.8, 2023.10 사례)."
+        liq_leads_market = ("유동성은 확장 중이나 주가가 조정을 받고 있습니다. "
+                            + (f"추정 선행 시차({lead_span})를 감안하면 이 괴리는 그 안에 주가 반등으로 해소될 여지가 있습니다."
+                               if lead_span else
+                               "유동성의 선행성이 뚜렷하지 않아 괴리가 해소되는 시점을 특정하기 어렵습니다."))
     elif liq_3m_chg < -1 and sp_1m_chg > 0:
-        liq_leads_market = "유동성은 수축하고 있으나 주가가 아직 상승 관성을 유지하고 있습니다. 실적 장세 가능성이 있으나, 유동성 역풍이 지속되면 3~6개월 내 조정 위험이 높아집니다."
+        liq_leads_market = ("유동성은 수축하고 있으나 주가가 아직 상승 관성을 유지하고 있습니다. 실적 장세 가능성이 있으나, "
+                            + (f"유동성 역풍이 지속되면 {lead_span} 안에 조정 위험이 높아집니다."
+                               if lead_span else
+                               "유동성 역풍이 지속되면 조정 위험이 높아집니다."))
     elif liq_3m_chg < -1 and sp_1m_chg < 0:
         liq_leads_market = "유동성 수축과 주가 하락이 동시에 진행 중입니다. 이는 2022년 상반기와 유사한 패턴으로, 유동성 방향 전환이 확인될 때까지 방어적 포지션이 필요합니다."
     else:
         liq_leads_market = "유동성과 주가가 동조적 흐름을 보이고 있어, 현재 시장은 유동성 환경을 충실히 반영하고 있습니다."
+    if lead_lag:
+        liq_leads_market += (
+            f' <span class="hl">교차상관</span> 최근 3년 유동성 1개월 변화율 vs 지수 1개월 수익률: '
+            f'동시점 ρ={lead_lag["same_day_corr"]:+.2f}, '
+            f'최대 ρ={lead_lag["best_corr"]:+.2f} (유동성 {lead_lag["best_lag"]}거래일 선행).'
+        )
 
     # 상관계수 변화 방향 감지
     corr_series = df["Corr_90d"].dropna()
@@ -1218,6 +2744,27 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
     else:
         corr_dir_text = f"상관계수 변화({corr_direction:+.3f})가 미미하여 기존 추세가 유지되고 있습니다."
 
+    # 창별 상관 표면 (단기 30·60일 vs 장기 252·504일)
+    corr_surface_text = ""
+    if corr_surface is not None and len(corr_surface):
+        last = corr_surface.iloc[-1]
+        cells = [f'{w}일 <span class="hl">{last[f"Corr_{w}d"]:+.2f}</span>'
+                 for w in CORR_WINDOWS if pd.notna(last[f"Corr_{w}d"])]
+        short = last[["Corr_30d", "Corr_60d"]].mean()
+        long_ = last[["Corr_252d", "Corr_504d"]].mean()
+        if cells:
+            corr_surface_text = " · ".join(cells) + ". "
+            if pd.notna(short) and pd.notna(long_):
+                gap = short - long_
+                if gap > 0.3:
+                    corr_surface_text += (f"단기 상관이 장기 평균보다 {gap:+.2f} 높아, "
+                                          "최근 들어 유동성 변수의 설명력이 평소보다 커진 국면입니다.")
+                elif gap < -0.3:
+                    corr_surface_text += (f"단기 상관이 장기 평균보다 {gap:+.2f} 낮아, "
+                                          "구조적 동조 관계에서 일시적으로 이탈(디커플링)한 국면입니다.")
+                else:
+                    corr_surface_text += "단기·장기 창의 상관이 비슷해 현재 관계가 일시적 현상이 아닌 구조적 흐름으로 보입니다."
+
     brief_corr = (
         f'<strong>▎유동성-지수 상관관계 심층 진단</strong><br>'
         f'90일 롤링 상관계수 <span class="hl">{corr_val:.3f}</span>. '
@@ -1234,7 +2781,8 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
                 '시장이 유동성 외 강력한 악재(지정학, 신용 이벤트 등)에 반응하고 있음을 시사합니다.')
         + f'<br><br>'
         f'<strong>추세 변화:</strong> {corr_dir_text}<br><br>'
-        f'<strong>선행/후행 분석:</strong> {liq_leads_market}<br><br>'
+        + (f'<strong>창별 상관:</strong> {corr_surface_text}<br><br>' if corr_surface_text else '')
+        + f'<strong>선행/후행 분석:</strong> {liq_leads_market}<br><br>'
         f'<strong>투자 시사점:</strong> '
         + (f'상관계수 {corr_val:.2f} 환경에서 유동성 방향({liq_3m_chg:+.1f}%)이 곧 시장 방향입니다. '
            f'본원통화 증감률 변화를 선행 지표로 활용하세요.'
@@ -1328,6 +2876,25 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
            else '공포 구간은 역사적으로 매수 기회가 되었습니다. 단, 추가 하락 가능성에 대비한 분할 매수 접근이 필요합니다.' if sentiment["score"] >= 30
            else '극도의 공포 구간입니다. 역발상 투자 관점에서 기회가 될 수 있으나, 시스템 리스크 확인이 선행되어야 합니다.')
     )
+    # 과거 점수 분포 대비 위치와 같은 구간이었던 날들의 실제 이후 수익률
+    if sentiment_history is not None and len(sentiment_history["score"]):
+        hist_score = sentiment_history["score"]
+        bt = sentiment_history["backtest"]
+        brief_sentiment += (
+            f'<br><br><strong>히스토리:</strong> 현재 점수는 {hist_score.index[0]:%Y}년 이후 '
+            f'{len(hist_score):,}거래일 중 상위 <span class="hl">{100 - sentiment_history["percentile"]:.0f}%</span> '
+            f'(백분위 {sentiment_history["percentile"]:.0f})입니다.'
+        )
+        if sentiment["label"] in bt.index.get_level_values("band"):
+            band_bt = bt.loc[sentiment["label"]]
+            cells = " · ".join(
+                f'{h} {band_bt.loc[h, "median"]:+.1f}% (상승 {band_bt.loc[h, "hit"]:.0f}%)'
+                for h in FORWARD_HORIZONS if h in band_bt.index
+            )
+            brief_sentiment += (
+                f' 같은 구간({sentiment["label"]})이었던 {int(band_bt["n"].max()):,}거래일의 '
+                f'이후 {idx_name} 수익률 중앙값: {cells}.'
+            )
 
     # ── 신용 시장 모니터 ──
     hyg_chg = _safe(cross, "hyg", "chg_1m")
@@ -1399,43 +2966,51 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
             )
 
     # ── 유동성 레짐 & 시장 단계 분석 ──
-    # 유동성 레짐 판별 (4단계)
-    if liq_3m_chg > 2 and liq_1m_chg > 0:
-        liq_regime = "적극적 확장 (Active Expansion)"
-        regime_color = "#16a34a"
-        regime_desc = (
-            "본원통화가 가속적으로 증가하고 있습니다. "
-            "이 레짐에서 주식·크립토·원자재 등 위험자산은 역사적으로 강한 상승세를 보였습니다. "
-            "2020년 하반기, 2023년 Q4가 대표적 사례입니다."
-        )
-        regime_strategy = "위험자산 비중 확대, 성장주·소형주 선호, 채권 듀레이션 축소"
-    elif liq_3m_chg > 0 and liq_1m_chg >= -0.5:
-        liq_regime = "완만한 확장 (Moderate Expansion)"
-        regime_color = "#65a30d"
-        regime_desc = (
-            "유동성이 점진적으로 증가하고 있습니다. "
-            "시장에 우호적이나 폭발적 상승보다는 안정적 우상향을 기대할 수 있습니다. "
-            "선별적 위험자산 배분이 유효합니다."
+    # 유동성 레짐 판별 (4단계) — 전 구간 분류와 같은 규칙
+    regime_code = classify_liq_regime(liq_1m_chg, liq_3m_chg)
+    if regime_code < 0:
+        regime_code = 2
+    liq_regime, regime_color = LIQ_REGIMES[regime_code]
+    regime_desc, regime_strategy = (
+        ("본원통화가 가속적으로 증가하고 있습니다. "
+         "위험자산 전반에 우호적인 환경이며, 2020년 하반기·2023년 Q4가 대표적 사례입니다.",
+         "위험자산 비중 확대, 성장주·소형주 선호, 채권 듀레이션 축소"),
+        ("유동성이 점진적으로 증가하고 있습니다. "
+         "시장에 우호적이나 폭발적 상승보다는 안정적 우상향을 기대할 수 있습니다. "
+         "선별적 위험자산 배분이 유효합니다.",
+         "균형 포트폴리오 유지, 퀄리티 성장주 중심, 분할 매수 접근"),
+        ("유동성이 보합 또는 초기 수축 단계에 있습니다. "
+         "이 구간은 시장 방향성이 불투명하며, 유동성 외 요인(실적·정책)에 민감하게 반응합니다. "
+         "변동성 확대에 대비한 포지션 관리가 핵심입니다.",
+         "방어적 자산 비중 상향, 현금 비중 확대, 헤지 전략 고려"),
+        ("본원통화가 뚜렷하게 감소하고 있습니다 (2022년 QT 시기와 같은 국면). "
+         "유동성 방향 전환 신호가 나올 때까지 보수적 운용이 필요합니다.",
+         "현금·단기채 비중 극대화, 위험자산 최소화, 역발상 매수는 유동성 전환 확인 후"),
+    )[regime_code]
+
+    # 같은 레짐이었던 과거 구간의 실제 이후 수익률
+    regime_history = ""
+    if regimes is not None and regime_code in regimes["stats"].index.get_level_values("regime"):
+        st_r = regimes["stats"].loc[regime_code]
+        base = regimes["baseline"]
+        cells = " · ".join(
+            f'{h} <span class="hl">{st_r.loc[h, "median"]:+.1f}%</span> (상승 {st_r.loc[h, "hit"]:.0f}%)'
+            for h in FORWARD_HORIZONS if h in st_r.index
         )
-        regime_strategy = "균형 포트폴리오 유지, 퀄리티 성장주 중심, 분할 매수 접근"
-    elif liq_3m_chg > -2 and liq_3m_chg <= 0:
-        liq_regime = "보합/초기 수축 (Neutral/Early Contraction)"
-        regime_color = "#ca8a04"
-        regime_desc = (
-            "유동성이 보합 또는 초기 수축 단계에 있습니다. "
-            "이 구간은 시장 방향성이 불투명하며, 유동성 외 요인(실적·정책)에 민감하게 반응합니다. "
-            "변동성 확대에 대비한 포지션 관리가 핵심입니다."
+        n_days = int(st_r["n"].max())
+        episodes = int(regimes["episodes"].get(regime_code, 0))
+        regime_history = (
+            f'{regimes["since"]:%Y}년 이후 이 레짐은 {n_days:,}거래일(에피소드 {episodes}회) 나타났고, '
+            f'이후 {idx_name} 수익률 중앙값은 {cells}입니다. '
         )
-        regime_strategy = "방어적 자산 비중 상향, 현금 비중 확대, 헤지 전략 고려"
-    else:
-        liq_regime = "적극적 수축 (Active Contraction)"
-        regime_color = "#dc2626"
-        regime_desc = (
-            "본원통화가 뚜렷하게 감소하고 있습니다. "
-            "이 레짐에서 위험자산은 역사적으로 큰 조정을 겪었습니다 (2022년 QT 시기). "
-            "유동성 방향 전환 신호가 나올 때까지 보수적 운용이 필요합니다."
-        )
-        regime_strategy = "현금·단기채 비중 극대화, 위험자산 최소화, 역발상 매수는 유동성 전환 확인 후"
+        if "6M" in st_r.index and "6M" in base.index:
+            edge = st_r.loc["6M", "median"] - base.loc["6M", "median"]
+            regime_history += (
+                f'전 구간 6M 중앙값({base.loc["6M", "median"]:+.1f}%) 대비 {edge:+.1f}%p로, '
+                + ("이 레짐의 유동성 효과가 역사적으로 뚜렷했습니다."
+                   if abs(edge) >= 2
+                   else "레짐만으로는 평균과 큰 차이가 없었습니다.")
+            )
 
     # 유동성-지수 괴리도 (Divergence Score)
     liq_norm_latest = df["Liquidity_norm"].iloc[-1] if "Liquidity_norm" in df.columns else 50
@@ -1459,7 +3034,8 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
         f'<span style="background:{regime_color};color:white;padding:4px 12px;border-radius:6px;'
         f'font-size:0.82rem;font-weight:700;">{liq_regime}</span></div><br><br>'
         f'{regime_desc}<br><br>'
-        f'<strong>전략적 대응:</strong> {regime_strategy}<br><br>'
+        + (f'<strong>과거 통계:</strong> {regime_history}<br><br>' if regime_history else '')
+        + f'<strong>전략적 대응:</strong> {regime_strategy}<br><br>'
         f'<strong>유동성-지수 괴리도:</strong> {div_comment}'
     )
 
@@ -1471,12 +3047,13 @@ def generate_dynamic_brief(country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m
 def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, corr_val, sp_1m_chg,
                             sp_yoy, liq_yoy, cross, sp_val, idx_name, sentiment_data=None):
     """Investment Advice를 실시간 데이터 기반으로 동적 생성 (포트폴리오 배분, 확신도, 역사적 맥락 포함)"""
+    stance = signal_stance(bullish_count, bearish_count)
 
-    if bullish_count >= 3:
+    if stance > 0:
         adv_stance = "비중 확대 (Overweight)"
         adv_stance_color = "var(--accent-green)"
         adv_icon = "🟢"
-    elif bearish_count >= 2:
+    elif stance < 0:
         adv_stance = "비중 축소 (Underweight)"
         adv_stance_color = "var(--accent-red)"
         adv_icon = "🔴"
@@ -1545,9 +3122,9 @@ def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, c
             risks.append('• 현재 주요 리스크 지표는 안정적 수준입니다. 다만 급변 가능성에 대비한 포지션 관리가 필요합니다.')
 
         # 포트폴리오 배분 추천 (미국)
-        if bullish_count >= 3:
+        if stance > 0:
             eq_pct, bond_pct, cash_pct, alt_pct = 70, 15, 5, 10
-        elif bearish_count >= 2:
+        elif stance < 0:
             eq_pct, bond_pct, cash_pct, alt_pct = 35, 35, 20, 10
         else:
             eq_pct, bond_pct, cash_pct, alt_pct = 55, 25, 10, 10
@@ -1566,7 +3143,7 @@ def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, c
 
         # 확신도 (Conviction Level)
         conviction = min(5, bullish_count + (1 if liq_yoy > 2 else 0) + (1 if sp_1m_chg > 3 else 0))
-        if bearish_count >= 2:
+        if stance < 0:
             conviction = max(1, 5 - bearish_count - (1 if vix_price > 25 else 0))
         conviction_stars = "★" * conviction + "☆" * (5 - conviction)
         conviction_desc = ["매우 낮음", "낮음", "보통", "높음", "매우 높음"][min(conviction, 4)]
@@ -1667,9 +3244,9 @@ def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, c
             risks.append('• 현재 주요 리스크 지표는 안정적 수준입니다. 다만 글로벌 변수에 대한 모니터링을 지속하세요.')
 
         # 포트폴리오 배분 추천 (한국)
-        if bullish_count >= 3:
+        if stance > 0:
             eq_pct, bond_pct, cash_pct, alt_pct = 65, 15, 10, 10
-        elif bearish_count >= 2:
+        elif stance < 0:
             eq_pct, bond_pct, cash_pct, alt_pct = 30, 35, 25, 10
         else:
             eq_pct, bond_pct, cash_pct, alt_pct = 50, 25, 15, 10
@@ -1688,7 +3265,7 @@ def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, c
 
         # 확신도
         conviction = min(5, bullish_count + (1 if liq_yoy > 2 else 0) + (1 if sp_1m_chg > 3 else 0))
-        if bearish_count >= 2:
+        if stance < 0:
             conviction = max(1, 5 - bearish_count - (1 if krw_p > 1400 else 0))
         conviction_stars = "★" * conviction + "☆" * (5 - conviction)
         conviction_desc = ["매우 낮음", "낮음", "보통", "높음", "매우 높음"][min(conviction, 4)]
@@ -1740,6 +3317,51 @@ def generate_dynamic_advice(country, bullish_count, bearish_count, liq_3m_chg, c
     return adv_body
 
 
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 브리핑·조언 렌더 메모 (스냅샷 키 + 스칼라 입력 해시 → HTML, 세션 간 공유)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+class _DigestPickler(pickle.Pickler):
+    """pandas 객체는 내용 대신 자리표시만 기록 — 스냅샷별 캐시 구조라 스냅샷 키가 내용을 대표"""
+
+    def persistent_id(self, obj):
+        return "frame" if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)) else None
+
+
+def content_digest(*parts):
+    """dict·리스트·스칼라 입력의 내용 해시 (피클 바이트의 sha1)"""
+    buf = io.BytesIO()
+    _DigestPickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(parts)
+    return hashlib.sha1(buf.getvalue()).hexdigest()
+
+
+def snapshot_fingerprint(value):
+    """데이터셋 스냅샷의 변경 감지용 해시 — 표는 길이와 끝 행(새 봉·미완성 봉이 바뀌는 곳)만 봄"""
+    def tail(v):
+        if isinstance(v, (pd.DataFrame, pd.Series)):
+            return len(v), v.index[-3:].asi8.tobytes(), v.iloc[-3:].to_numpy(float).tobytes()
+        return v
+    return content_digest(*(tail(v) for v in (value if isinstance(value, tuple) else (value,))))
+
+
+@st.cache_resource(max_entries=4 * sum(len(cfg["indices"]) for cfg in COUNTRY_CONFIG.values()))
+def _memo_render(digest, _render, _args, _kwargs):
+    """digest별 한 번만 렌더 — 렌더러와 인자는 해시하지 않음"""
+    return _render(*_args, **_kwargs)
+
+
+def _memo_part(value):
+    """스칼라 인자는 그대로, 표·dict·리스트는 타입 이름만 (내용은 스냅샷 키가 대표)"""
+    return value if value is None or isinstance(value, (str, int, float, np.number)) else type(value).__name__
+
+
+def memo_render(render, snapshot_key, *args, **kwargs):
+    """순수 렌더러 결과를 (렌더러, 스냅샷 키, 스칼라 인자) 해시로 공유 — 데이터 갱신 전까지 재조립 없음.
+    큰 입력은 매 재실행마다 피클·해시하지 않으므로 snapshot_key가 그 입력의 데이터셋 스냅샷을 모두 담아야 함"""
+    digest = content_digest(render.__qualname__, snapshot_key, [_memo_part(v) for v in args],
+                            sorted((k, _memo_part(v)) for k, v in kwargs.items()))
+    return _memo_render(digest, render, args, kwargs)
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 차트 헬퍼
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -1813,28 +3435,51 @@ st.markdown("""
 <div id="main-content"></div>
 """, unsafe_allow_html=True)
 
-# 새로고침 상태 바
-now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-next_str = NEXT_REFRESH_TIME.strftime("%H:%M:%S KST")
-st.markdown(
-    f'<div class="refresh-bar" role="status" aria-live="polite" aria-label="실시간 갱신 상태">'
-    f'<span class="refresh-dot" aria-hidden="true"></span>'
-    f'<span>실시간 갱신: <time datetime="{datetime.now().strftime("%Y-%m-%dT%H:%M:%S")}">{now_str}</time> · 다음 업데이트: {next_str} (5분 간격)</span>'
-    f'</div>',
-    unsafe_allow_html=True,
-)
+# 새로고침 상태 바 (데이터 스냅샷 시각은 로딩 후 채움)
+refresh_bar = st.empty()
+
+
+def render_refresh_bar(snapshot_at=None, down_sources=()):
+    """down_sources: 서킷 브레이커가 열린 소스 이름 — 있으면 마지막 정상 데이터를 표시 중임을 알림"""
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    snapshot_html = ""
+    stale = bool(down_sources)
+    if snapshot_at is not None:
+        age_sec = (datetime.now(ZoneInfo("Asia/Seoul")) - snapshot_at).total_seconds()
+        age_min = int(age_sec // 60)
+        age_str = "방금" if age_min < 1 else f"{age_min}분 전"
+        # 갱신 주기 2회분 이상 묵은 데이터도 stale로 간주
+        stale = stale or age_sec > 2 * REFRESH_INTERVAL_SEC
+        snapshot_html = (
+            f' · 데이터 기준: <time datetime="{snapshot_at.strftime("%Y-%m-%dT%H:%M:%S%z")}">'
+            f'{snapshot_at.strftime("%H:%M:%S KST")}</time> ({age_str})'
+        )
+    stale_html = ""
+    if down_sources:
+        labels = ", ".join(SOURCE_LABELS[name] for name in down_sources)
+        stale_html = f' · ⚠ {labels} 응답 없음 — 마지막 정상 데이터 표시 중'
+    refresh_bar.markdown(
+        f'<div class="refresh-bar{" stale" if stale else ""}" role="status" aria-live="polite" aria-label="실시간 갱신 상태">'
+        f'<span class="refresh-dot" aria-hidden="true"></span>'
+        f'<span>실시간 갱신: <time datetime="{datetime.now().strftime("%Y-%m-%dT%H:%M:%S")}">{now_str}</time>'
+        f'{snapshot_html}{stale_html} · 데이터가 바뀌면 자동 반영 ({LIVE_POLL_SEC}초 간격 확인)</span>'
+        f'</div>',
+        unsafe_allow_html=True,
+    )
+
+
+render_refresh_bar()
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 레이아웃 컨테이너 설정
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-kpi_container = st.container()
-brief_container = st.container()
+summary_container = st.container()   # KPI + 브리핑 (로딩 후 프래그먼트가 채움)
 st.write("") # 간격
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# 통합 컨트롤 바 (국가 · 지수 · 기간 · 봉주기 · 이벤트)
+# 컨트롤 바 (국가 · 지수 · 기간 — 바꾸면 전체 재실행, 이벤트·레짐은 차트 프래그먼트, 봉 주기는 차트 안)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-ctrl1, ctrl2, ctrl3, ctrl4, ctrl5 = st.columns([1, 1, 1, 1, 1])
+ctrl1, ctrl2, ctrl3, _ = st.columns([1, 1, 1, 2])
 with ctrl1:
     country = st.selectbox("🌍 국가", list(COUNTRY_CONFIG.keys()), index=0)
 CC = COUNTRY_CONFIG[country]
@@ -1849,33 +3494,76 @@ with ctrl2:
     idx_name = st.selectbox("📈 지수", list(IDX_OPTIONS.keys()), key="idx_select")
     idx_ticker = IDX_OPTIONS[idx_name]
 with ctrl3:
-    period = st.selectbox("📅 기간", ["3년", "5년", "7년", "10년", "전체"], index=3)
-with ctrl4:
-    tf = st.selectbox("🕯️ 봉", ["일봉", "주봉", "월봉"], index=1, key="candle_tf")
-with ctrl5:
-    show_events = st.toggle("📌 이벤트", value=False)
+    period = st.selectbox("📅 기간", list(PERIOD_YEARS), index=3)   # 차트와 이벤트 타임라인이 같이 씀
+loader_jobs = {
+    "market": (load_data, (idx_ticker, CC["fred_liq"], CC["fred_rec"], CC["liq_divisor"])),
+    "cross": (load_cross_asset_data, ()),
+    "fed": (load_fed_funds_rate, ()),
+    "bok": (load_bok_base_rate, ()),
+    "news": (load_market_news, ()),
+}
+with st.spinner(f"{CC['liq_label']} & {idx_name} 데이터를 불러오는 중..."):
+    loaded, load_failures = run_loaders(loader_jobs)
+    df, ohlc_raw = loaded["market"] or (None, None)
+    cross_data = loaded["cross"]
+    fed_rate_data = loaded["fed"]
+    bok_rate_data = loaded["bok"]
+    news_data = loaded["news"]
+
+# 화면에 쓰인 데이터 중 가장 오래된 스냅샷 시각을 신선도로 표시
+snapshot_times = [
+    t for t in (get_refresher().fetched_at((name,) + args) for name, (_, args) in loader_jobs.items())
+    if t is not None
+]
+down_sources = [name for name, breaker in get_breakers().items() if breaker.is_open]
+render_refresh_bar(min(snapshot_times) if snapshot_times else None, down_sources)
 
-period_map = {"3년": 3, "5년": 5, "7년": 7, "10년": 10, "전체": 27}
-period_years = period_map[period]
-cutoff = datetime.now() - timedelta(days=365 * period_years)
 
-with st.spinner(f"{CC['liq_label']} & {idx_name} 데이터를 불러오는 중..."):
-    df, ohlc_raw = load_data(idx_ticker, CC["fred_liq"], CC["fred_rec"], CC["liq_divisor"])
-    cross_data = load_cross_asset_data()
-    fed_rate_data = load_fed_funds_rate()
-    bok_rate_data = load_bok_base_rate()
-    news_data = load_market_news()
+@fragment(run_every=LIVE_POLL_SEC)
+def watch_snapshots(loader_jobs, rendered):
+    """화면을 그린 뒤 데이터셋 스냅샷이 실제로 바뀌었는지 주기적으로 확인.
+    평소엔 스냅샷 조회(오래됐으면 백그라운드 재검증 예약)와 지문 비교뿐이고 아무것도 그리지 않음.
+    바뀌면 전체 재실행 — 웹소켓 위에서 KPI·브리핑이 제자리 갱신되고, 차트는 고정된 iframe에
+    새 봉만 전달(render_chart의 라이브 피드)."""
+    refresher = get_refresher()
+    pool = _get_loader_pool()
+    for name, (fn, args) in loader_jobs.items():
+        key = (name,) + args
+        if refresher.fetched_at(key) is None:
+            pool.submit(refresher.get, key, fn, *args)   # 콜드 — 다음 확인 때 반영
+        elif snapshot_fingerprint(refresher.get(key, fn, *args)) != rendered[name]:
+            st.rerun()
+
+
+watch_snapshots(loader_jobs, {name: snapshot_fingerprint(value) for name, value in loaded.items()})
 
 if df is None or df.empty:
+    if "market" in load_failures:
+        st.error(load_failures["market"])
     st.error("데이터를 불러올 수 없습니다. 잠시 후 새로고침 해주세요.")
     st.stop()
 
-ALL_EVENTS = sorted(CC["events"], key=lambda x: x[0])
+# 현재 지수 데이터 스냅샷 시각 — 갱신당 한 번만 만드는 파생 구조(차트 일봉·교차상관)의 캐시 키
+market_snapshot_at = get_refresher().fetched_at(("market",) + loader_jobs["market"][1])
+lead_lag = get_lead_lag(idx_ticker, market_snapshot_at, df)
+corr_surface = get_corr_surface(idx_ticker, market_snapshot_at, df)
+liq_regimes = get_liq_regimes(idx_ticker, market_snapshot_at, df)
+event_study = get_event_study(country, idx_ticker, market_snapshot_at, df)
+cross_snapshot_at = get_refresher().fetched_at(("cross",))
+sentiment_history = get_sentiment_history(idx_ticker, market_snapshot_at, cross_snapshot_at, df)
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# KPI
+# KPI · Daily Brief · Investment Advice (프래그먼트)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-with kpi_container:
+@fragment
+def render_summary(country, idx_name, df, cross_data, fed_rate_data, bok_rate_data, news_data,
+                   load_failures, lead_lag, corr_surface, liq_regimes, sentiment_history, snapshot_key):
+    """KPI 카드와 브리핑·투자 조언 — 입력은 로더 결과와 스냅샷별 캐시 구조뿐이라
+    차트 컨트롤 조작(차트 프래그먼트 재실행)에는 다시 계산되지 않음.
+    snapshot_key: 로더별 (이름, 스냅샷 시각 — 이번 실행에서 실패했으면 None) — 브리핑 HTML 메모 키"""
+    CC = COUNTRY_CONFIG[country]
+
+    # ── KPI ──
     latest = df.dropna(subset=["Liquidity", "SP500"]).iloc[-1]
     liq_val = latest["Liquidity"]
     sp_val = latest["SP500"]
@@ -1891,6 +3579,11 @@ with kpi_container:
 
     corr_cls = "up" if corr_val >= 0.3 else "down"
     corr_desc = "강한 양의 상관" if corr_val >= 0.5 else ("약한 양의 상관" if corr_val >= 0 else "음의 상관")
+    corr_now = corr_surface.iloc[-1]
+    corr_windows_html = " · ".join(
+        f'{w}d {corr_now[f"Corr_{w}d"]:+.2f}' if pd.notna(corr_now[f"Corr_{w}d"]) else f"{w}d —"
+        for w in CORR_WINDOWS
+    )
 
     liq_display = f"{CC['liq_prefix']}{liq_val:,.0f}{CC['liq_suffix']}"
 
@@ -1912,6 +3605,7 @@ with kpi_container:
             <div class="kpi-label"><span aria-hidden="true">🔗</span> 90일 상관계수</div>
             <div class="kpi-value">{corr_val:.3f}</div>
             <div class="kpi-delta {corr_cls}">{corr_desc}</div>
+            <div class="kpi-surface" aria-label="창별 상관계수">{corr_windows_html}</div>
         </div>
         <div class="kpi purple" role="listitem" aria-label="데이터 범위: {df.index.min().strftime('%Y.%m')}부터 {df.index.max().strftime('%Y.%m')}까지, 총 {len(df):,}일">
             <div class="kpi-label"><span aria-hidden="true">📅</span> 데이터 범위</div>
@@ -1922,11 +3616,7 @@ with kpi_container:
     </section>
     """, unsafe_allow_html=True)
 
-
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# Daily Brief (실시간 데이터 기반 동적 생성)
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-with brief_container:
+    # ── Daily Brief (실시간 데이터 기반 동적 생성) ──
     today_str = datetime.now().strftime("%Y년 %m월 %d일")
     liq_3m = df["Liquidity"].dropna()
     liq_3m_chg = ((liq_3m.iloc[-1] - liq_3m.iloc[-63]) / liq_3m.iloc[-63] * 100) if len(liq_3m) > 63 else 0
@@ -1943,20 +3633,12 @@ with brief_container:
     liq_1m_chg = ((liq_3m.iloc[-1] - liq_3m.iloc[-21]) / liq_3m.iloc[-21] * 100) if len(liq_3m) > 21 else 0
 
     # 시그널 판정 (다층 분석)
-    bullish_count = 0
-    bearish_count = 0
-    if corr_val > 0.5: bullish_count += 1
-    elif corr_val < 0: bearish_count += 1
-    if liq_3m_chg > 0: bullish_count += 1
-    elif liq_3m_chg < -1: bearish_count += 1
-    if sp_1m_chg > 0: bullish_count += 1
-    elif sp_1m_chg < -3: bearish_count += 1
-    if liq_yoy > 0: bullish_count += 1
-    elif liq_yoy < -2: bearish_count += 1
-
-    if bullish_count >= 3:
+    bullish_count, bearish_count = signal_counts(corr_val, liq_3m_chg, sp_1m_chg, liq_yoy)
+    stance = signal_stance(bullish_count, bearish_count)
+
+    if stance > 0:
         signal_class, signal_text = "signal-bullish", "🟢 유동성 확장 + 강한 상관 + 시장 모멘텀 → 상승 추세 지지"
-    elif bearish_count >= 2:
+    elif stance < 0:
         signal_class, signal_text = "signal-bearish", "🔴 유동성 수축 또는 상관 이탈 → 하방 리스크 경계"
     else:
         signal_class, signal_text = "signal-neutral", "🟡 혼합 시그널 → 방향성 모색 중, 변동성 확대 주의"
@@ -1964,10 +3646,11 @@ with brief_container:
     # 동적 Daily Brief 생성 (확장판)
     (brief_policy, brief_liq, brief_market, brief_corr, brief_cross,
      brief_yield_curve, brief_sector_rotation, brief_commodity,
-     brief_sentiment, brief_credit, brief_news, brief_regime) = generate_dynamic_brief(
-        country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m_chg, liq_6m_chg,
+     brief_sentiment, brief_credit, brief_news, brief_regime) = memo_render(
+        generate_dynamic_brief, snapshot_key, country, df, liq_display, liq_yoy, liq_1m_chg, liq_3m_chg, liq_6m_chg,
         sp_val, sp_1w_chg, sp_1m_chg, sp_3m_chg, sp_yoy, corr_val,
-        idx_name, cross_data, fed_rate_data, bok_rate_data, news_data
+        idx_name, cross_data, fed_rate_data, bok_rate_data, news_data, lead_lag, corr_surface, liq_regimes,
+        sentiment_history
     )
 
     # 센티먼트 데이터 (Advice에서도 활용)
@@ -1989,6 +3672,12 @@ with brief_container:
         brief_extra_sections += f'<hr class="report-divider">{brief_commodity}'
     if brief_news:
         brief_extra_sections += f'<hr class="report-divider">{brief_news}'
+    elif "news" in load_failures:
+        brief_extra_sections += (
+            f'<hr class="report-divider"><strong>▎관련 뉴스 & 이슈 요약</strong><br>'
+            f'<span style="font-size:0.8rem;color:var(--text-muted);">'
+            f'뉴스 피드 응답 지연으로 이번 갱신에서는 생략되었습니다. 다음 갱신 시 표시됩니다.</span>'
+        )
 
     st.markdown(
         f'<article role="article" aria-label="일일 시장 브리핑">'
@@ -2022,8 +3711,8 @@ with brief_container:
     # 투자 조언 (Investment Advice — 실시간 데이터 기반 동적 생성, 확장판)
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-    adv_body = generate_dynamic_advice(
-        country, bullish_count, bearish_count, liq_3m_chg, corr_val, sp_1m_chg,
+    adv_body = memo_render(
+        generate_dynamic_advice, snapshot_key, country, bullish_count, bearish_count, liq_3m_chg, corr_val, sp_1m_chg,
         sp_yoy, liq_yoy, cross_data, sp_val, idx_name, sentiment_data
     )
 
@@ -2049,564 +3738,282 @@ with brief_container:
         unsafe_allow_html=True,
     )
 
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# 차트 (TradingView Lightweight Charts)
-# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-dff = df[df.index >= pd.to_datetime(cutoff)].copy()
-
-# ── OHLC 리샘플 ──
-def resample_ohlc(ohlc_df, rule):
-    return ohlc_df.resample(rule).agg({
-        'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'
-    }).dropna()
-
-ohlc_filtered = ohlc_raw[ohlc_raw.index >= pd.to_datetime(cutoff)].copy()
-
-if tf == "주봉":
-    ohlc_chart = resample_ohlc(ohlc_filtered, "W")
-elif tf == "월봉":
-    ohlc_chart = resample_ohlc(ohlc_filtered, "ME")
-else:
-    ohlc_chart = ohlc_filtered.copy()
-
-# 이동평균
-for ma_len in [20, 60, 120]:
-    ohlc_chart[f"MA{ma_len}"] = ohlc_chart["Close"].rolling(ma_len).mean()
-
-# ── 유동성 데이터를 캔들 타임프레임에 맞춰 리샘플 ──
-liq_series_raw = dff["Liq_MA"].dropna()
-if tf == "주봉":
-    liq_resampled = liq_series_raw.resample("W").last().dropna()
-elif tf == "월봉":
-    liq_resampled = liq_series_raw.resample("ME").last().dropna()
-else:
-    liq_resampled = liq_series_raw.copy()
-
-# ━━━━ 핵심: 순차 인덱스 방식으로 시간축 균일화 ━━━━
-# lightweight-charts는 날짜 간격에 비례해 봉 간격을 배치하므로
-# 주봉(7일)·월봉(30일)은 일봉 대비 넓게 퍼짐.
-# → 모든 봉을 연속 "가상 일봉 날짜"로 매핑하여 균일 간격 보장.
-candle_dates = ohlc_chart.index.tolist()           # 실제 날짜 (화면 표시용)
-n_candles = len(candle_dates)
-
-# 가상 날짜: 2000-01-03(월요일)부터 영업일 연속 배정
-virtual_base = pd.Timestamp("2000-01-03")
-virtual_dates = pd.bdate_range(start=virtual_base, periods=n_candles)  # 영업일
-real_to_virtual = {candle_dates[i]: virtual_dates[i] for i in range(n_candles)}
-virtual_to_real = {virtual_dates[i]: candle_dates[i] for i in range(n_candles)}
-
-def to_lw_time(dt):
-    return dt.strftime('%Y-%m-%d')
-
-# ── 캔들 데이터 (가상 날짜 사용) ──
-candle_data = []
-for i, (dt, row) in enumerate(ohlc_chart.iterrows()):
-    candle_data.append({
-        "time": to_lw_time(virtual_dates[i]),
-        "open": round(float(row["Open"]), 2),
-        "high": round(float(row["High"]), 2),
-        "low": round(float(row["Low"]), 2),
-        "close": round(float(row["Close"]), 2),
-    })
 
-# ── 거래량 데이터 ──
-volume_data = []
-for i, (dt, row) in enumerate(ohlc_chart.iterrows()):
-    is_up = row["Close"] >= row["Open"]
-    volume_data.append({
-        "time": to_lw_time(virtual_dates[i]),
-        "value": float(row["Volume"]),
-        "color": "rgba(16,185,129,0.4)" if is_up else "rgba(239,68,68,0.4)",
-    })
+# 브리핑 메모 키 — 요약에 쓰인 모든 데이터셋의 스냅샷 시각 (이번 실행에서 실패한 로더는 None)
+snapshot_key = tuple(
+    (name, None if name in load_failures else get_refresher().fetched_at((name,) + args))
+    for name, (_, args) in loader_jobs.items()
+)
+with summary_container:
+    render_summary(country, idx_name, df, cross_data, fed_rate_data, bok_rate_data, news_data,
+                   load_failures, lead_lag, corr_surface, liq_regimes, sentiment_history, snapshot_key)
 
-# ── 이동평균 데이터 ──
-ma_data = {}
-for ma_len in [20, 60, 120]:
-    col = f"MA{ma_len}"
-    items = []
-    for i, (dt, row) in enumerate(ohlc_chart.iterrows()):
-        v = row.get(col)
-        if pd.notna(v):
-            items.append({"time": to_lw_time(virtual_dates[i]), "value": round(float(v), 2)})
-    ma_data[col] = items
-
-# ── 유동성 데이터 (캔들 날짜에 스냅) ──
-liq_data = []
-for i, cdt in enumerate(candle_dates):
-    # 캔들 날짜 이하에서 가장 가까운 유동성 값
-    mask = liq_resampled.index <= cdt
-    if mask.any():
-        val = float(liq_resampled[mask].iloc[-1])
-        liq_data.append({"time": to_lw_time(virtual_dates[i]), "value": round(val, 2)})
-
-# ── 이벤트 마커 (캔들 날짜에 정확히 스냅) ──
-def snap_to_candle(event_dt, candle_index):
-    """이벤트 날짜를 가장 가까운 캔들 날짜로 스냅"""
-    diffs = abs(candle_index - event_dt)
-    nearest_idx = diffs.argmin()
-    return nearest_idx
-
-marker_data = []
-if show_events:
-    gap_map = {"일봉": 10, "주봉": 4, "월봉": 2}
-    min_gap_bars = gap_map.get(tf, 5)  # 봉 개수 기준 최소 간격
-    prev_bar_idx = -999
-    for date_str, title, desc, emoji, direction in ALL_EVENTS:
-        evt_dt = pd.to_datetime(date_str)
-        if evt_dt < candle_dates[0] - timedelta(days=35) or evt_dt > candle_dates[-1] + timedelta(days=35):
-            continue
-        bar_idx = snap_to_candle(evt_dt, ohlc_chart.index)
-        if abs(bar_idx - prev_bar_idx) < min_gap_bars:
-            continue
-        prev_bar_idx = bar_idx
-        if 0 <= bar_idx < n_candles:
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 차트 (TradingView Lightweight Charts, 프래그먼트)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+@fragment
+def render_chart(country, idx_name, idx_ticker, df, ohlc_raw, market_snapshot_at, liq_regimes, period):
+    """차트 컨트롤(이벤트·레짐)과 차트 — 컨트롤을 바꾸면 이 함수만 다시 실행됨.
+    기간은 컨트롤 바 값, 봉 주기(일·주·월봉)는 차트 안 버튼으로 브라우저에서 전환"""
+    CC = COUNTRY_CONFIG[country]
+    events, event_dates = country_events(country)
+
+    ctrl4, _ = st.columns([1, 4])
+    with ctrl4:
+        show_events = st.toggle("📌 이벤트", value=False)
+        show_regimes = st.toggle("🎨 레짐", value=False, help="유동성 레짐(확장·수축 4단계)을 차트 배경색으로 표시")
+    cutoff = datetime.now() - timedelta(days=365 * PERIOD_YEARS[period])
+
+    daily = get_daily_ohlc(idx_ticker, market_snapshot_at, ohlc_raw, df["Liq_MA"])
+
+    # ── 이벤트 마커 (날짜만 보냄 — 일봉 스냅·봉 주기별 최소 간격은 브라우저) ──
+    marker_data = []
+    if show_events and len(daily.bars):
+        idx = daily.bars.index
+        in_range = (event_dates >= idx[0] - timedelta(days=35)) & (event_dates <= idx[-1] + timedelta(days=35))
+        event_days = _as_ns(event_dates).astype("datetime64[D]").astype(np.int64)
+        for (date_str, title, desc, emoji, direction), ok, day in zip(events, in_range, event_days):
+            if not ok:
+                continue
             marker_data.append({
-                "time": to_lw_time(virtual_dates[bar_idx]),
+                "day": int(day),
                 "position": "aboveBar" if direction == "up" else "belowBar",
                 "color": "#10b981" if direction == "up" else "#ef4444",
                 "shape": "arrowUp" if direction == "up" else "arrowDown",
                 "text": f"{emoji} {title}",
             })
 
-# ── 실제↔가상 날짜 매핑 (JS에서 tooltip용) ──
-date_label_map = {}
-for i in range(n_candles):
-    vk = to_lw_time(virtual_dates[i])
-    rk = candle_dates[i].strftime('%Y-%m-%d')
-    date_label_map[vk] = rk
-
-# ── JSON 직렬화 ──
-candle_json = json.dumps(candle_data)
-volume_json = json.dumps(volume_data)
-ma20_json = json.dumps(ma_data.get("MA20", []))
-ma60_json = json.dumps(ma_data.get("MA60", []))
-ma120_json = json.dumps(ma_data.get("MA120", []))
-liq_json = json.dumps(liq_data)
-marker_json = json.dumps(marker_data)
-date_map_json = json.dumps(date_label_map)
-
-# 차트 설정
-chart_height = 650
-liq_label = CC["liq_label"]
-liq_suffix = CC["liq_suffix"]
-default_bar_spacing = 6  # 모든 타임프레임 동일 (균일 간격이므로)
-
-# ── Lightweight Charts HTML ──
-lw_html = f"""
-<!DOCTYPE html>
-<html lang="ko">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=5.0">
-<script src="https://cdn.jsdelivr.net/npm/lightweight-charts@4.2.0/dist/lightweight-charts.standalone.production.js"></script>
-<style>
-  * {{ margin:0; padding:0; box-sizing:border-box; }}
-  body {{ font-family: 'Pretendard', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; background: transparent; overflow:hidden; }}
-
-  #chart-wrapper {{
-    position: relative;
-    width: 100%;
-    height: {chart_height}px;
-    background: #ffffff;
-    border: 1px solid #e2e8f0;
-    border-radius: 14px;
-    overflow: hidden;
-  }}
-
-  /* ── 상단 OHLC 정보 오버레이 ── */
-  #info-overlay {{
-    position: absolute;
-    top: 10px; left: 14px;
-    z-index: 10;
-    pointer-events: none;
-    font-family: 'SF Mono', 'Cascadia Code', 'IBM Plex Mono', 'Consolas', monospace;
-  }}
-  #info-title {{
-    font-size: 13px; font-weight: 700;
-    color: #1e293b;
-    margin-bottom: 3px;
-    display: flex; align-items: center; gap: 8px;
-  }}
-  #info-title .idx-name {{ font-family: 'Pretendard', sans-serif; }}
-  #info-title .idx-tf {{ font-size: 11px; color: #94a3b8; font-weight: 500; }}
-  #info-title .idx-date {{ font-size: 11px; color: #64748b; font-weight: 500; }}
-  #info-ohlc {{
-    display: flex; flex-wrap: wrap; gap: 3px 10px;
-    font-size: 11.5px; color: #64748b;
-    line-height: 1.55;
-  }}
-  #info-ohlc .label {{ color: #94a3b8; font-weight: 500; }}
-  #info-ohlc .val {{ font-weight: 600; }}
-
-  #ma-legend {{
-    display: flex; gap: 10px;
-    font-size: 10.5px; margin-top: 2px;
-  }}
-  #ma-legend span {{ display:flex; align-items:center; gap:3px; }}
-  #ma-legend .dot {{ width:8px; height:3px; border-radius:2px; display:inline-block; }}
-  .ma20-dot {{ background:#f59e0b; }}
-  .ma60-dot {{ background:#3b82f6; }}
-  .ma120-dot {{ background:#8b5cf6; }}
-  .liq-dot {{ background:rgba(59,130,246,0.5); width:12px!important; height:8px!important; border-radius:3px!important; }}
-
-  #vol-label {{
-    position: absolute;
-    bottom: 6px; left: 14px;
-    font-size: 10px; color: #94a3b8;
-    z-index: 10; pointer-events: none;
-    font-family: 'SF Mono', monospace;
-  }}
-
-  /* ── 모바일 ── */
-  @media (max-width: 768px) {{
-    #info-overlay {{ top: 6px; left: 8px; }}
-    #info-title {{ font-size: 12px; }}
-    #info-ohlc {{ font-size: 10px; gap: 2px 7px; }}
-    #ma-legend {{ font-size: 9.5px; gap: 5px; }}
-    #vol-label {{ font-size: 8.5px; }}
-  }}
-  @media (max-width: 480px) {{
-    #info-ohlc {{ font-size: 9px; gap: 1px 5px; }}
-    #ma-legend {{ font-size: 8.5px; gap: 3px; flex-wrap: wrap; }}
-  }}
-</style>
-</head>
-<body>
-<div id="chart-wrapper" role="figure" aria-label="{idx_name} {tf} 가격 차트 - 캔들스틱, 이동평균선, 유동성 오버레이 포함">
-  <div id="info-overlay" aria-live="polite" aria-atomic="true">
-    <div id="info-title">
-      <span class="idx-name">{idx_name}</span>
-      <span class="idx-tf">{tf}</span>
-      <span class="idx-date" id="v-date"></span>
-    </div>
-    <div id="info-ohlc">
-      <span><abbr class="label" title="시가">시</abbr> <span class="val" id="v-open">-</span></span>
-      <span><abbr class="label" title="고가">고</abbr> <span class="val" id="v-high">-</span></span>
-      <span><abbr class="label" title="저가">저</abbr> <span class="val" id="v-low">-</span></span>
-      <span><abbr class="label" title="종가">종</abbr> <span class="val" id="v-close">-</span></span>
-      <span id="v-chg-wrap"><span class="val" id="v-chg" aria-label="전일 대비 변동률">-</span></span>
-      <span><span class="label">거래량</span> <span class="val" id="v-vol">-</span></span>
-      <span><span class="label">{liq_label}</span> <span class="val" id="v-liq" style="color:#3b82f6">-</span></span>
-    </div>
-    <div id="ma-legend" aria-label="이동평균선 범례">
-      <span><span class="dot ma20-dot" aria-hidden="true"></span><span id="v-ma20" style="color:#f59e0b">MA20 -</span></span>
-      <span><span class="dot ma60-dot" aria-hidden="true"></span><span id="v-ma60" style="color:#3b82f6">MA60 -</span></span>
-      <span><span class="dot ma120-dot" aria-hidden="true"></span><span id="v-ma120" style="color:#8b5cf6">MA120 -</span></span>
-      <span><span class="dot liq-dot" aria-hidden="true"></span><span style="color:rgba(59,130,246,0.7);">{liq_label}</span></span>
-    </div>
-  </div>
-  <div id="vol-label" aria-hidden="true">Volume</div>
-  <div id="chart-container" role="img" aria-label="{idx_name} {tf} 인터랙티브 차트" tabindex="0"></div>
-</div>
+    # ── 차트 컴포넌트: 인스턴스는 key로 고정되어 계속 살아 있고, 인자 변화만 반영됨.
+    #    브라우저가 보고한 값(불러온 구간·스냅샷·보이는 구간)을 보고 빠진 일봉 조각만 보냄 ──
+    have = st.session_state.get("lw_chart")
+    if not have or have.get("chart") != idx_ticker:
+        have = None
+    cutoff_day = day_number(cutoff)
+    need_day = cutoff_day
+    if have and have.get("visible"):
+        vf, vt = have["visible"]
+        need_day = min(cutoff_day, vf - (vt - vf))   # 보이는 구간 왼쪽으로 한 화면 더
+    show_regimes = show_regimes and liq_regimes is not None
+    regime_codes = None
+    if show_regimes or (have and have["rg"] and liq_regimes is not None):
+        regime_codes = np.nan_to_num(align_asof(daily.bars.index, liq_regimes["codes"]), nan=-1).astype(np.int8)
+    snap = str(market_snapshot_at)   # 컴포넌트 인자·값은 JSON이므로 문자열로
+    # 브라우저가 가진 스냅샷으로 보냈던 일봉 (공유 캐시 객체 참조만 보관) — 바뀐 앞쪽 봉을 찾는 기준
+    sent = st.session_state.get("lw_chart_sent", {})
+    held = sent.get(have["snap"]) if have else None
+    chunks = plan_chart_chunks(daily, snap, have, need_day - CHART_MARGIN_DAYS, regime_codes, held)
+    st.session_state["lw_chart_sent"] = {**({have["snap"]: held} if held else {}), snap: (daily, regime_codes)}
+
+    chart_height = 650
+    lw_chart(
+        options={
+            "chart": idx_ticker,
+            "height": chart_height,
+            "idx_name": idx_name,
+            "liq_label": CC["liq_label"],
+            "liq_suffix": CC["liq_suffix"],
+            "default_tf": DEFAULT_TIMEFRAME,
+            "ma": list(MA_LENGTHS),
+            "marker_gap": MARKER_GAP_BARS,
+            "range": {"id": period, "from": cutoff_day},
+            "markers": marker_data,
+            "regimes": show_regimes,
+            "regime_colors": [
+                f"rgba({int(c[1:3], 16)},{int(c[3:5], 16)},{int(c[5:7], 16)},0.08)" for _, c in LIQ_REGIMES
+            ],
+        },
+        chunks=chunks,
+        key="lw_chart",
+        default=None,
+    )
+
+    # 최근 캔들 요약
+    if len(daily.bars) >= 2:
+        last = daily.bars.iloc[-1]
+        prev = daily.bars.iloc[-2]
+        chg = (last["Close"] - prev["Close"]) / prev["Close"] * 100
+        chg_arrow = "▲" if chg >= 0 else "▼"
+        chg_color = "green" if chg >= 0 else "red"
+        chg_direction = "상승" if chg >= 0 else "하락"
+        st.markdown(
+            f'<div class="guide-box" role="status" aria-label="최근 일봉 요약: 종가 {last["Close"]:,.0f}, {chg_direction} {abs(chg):.2f}%">'
+            f'<span aria-hidden="true">🕯️</span> <strong>최근 일봉:</strong> '
+            f'시 <strong>{last["Open"]:,.0f}</strong> · '
+            f'고 <strong>{last["High"]:,.0f}</strong> · '
+            f'저 <strong>{last["Low"]:,.0f}</strong> · '
+            f'종 <strong>{last["Close"]:,.0f}</strong> '
+            f'<span style="color:var(--accent-{chg_color})">{chg_arrow} {chg:+.2f}%<span class="sr-only"> ({chg_direction})</span></span>'
+            f'<br>'
+            f'이평선: <span style="color:#f59e0b">MA20</span> · '
+            f'<span style="color:#3b82f6">MA60</span> · '
+            f'<span style="color:#8b5cf6">MA120</span> · '
+            f'<span style="color:rgba(59,130,246,0.6)">파란 영역</span> = {CC["liq_label"]}'
+            f'</div>',
+            unsafe_allow_html=True,
+        )
+
 
-<script>
-(function() {{
-  const wrapper = document.getElementById('chart-wrapper');
-  const container = document.getElementById('chart-container');
-  container.style.width = '100%';
-  container.style.height = '{chart_height}px';
-
-  // 실제 날짜 매핑
-  const dateMap = {date_map_json};
-
-  // ── 차트 생성 ──
-  const chart = LightweightCharts.createChart(container, {{
-    width: wrapper.clientWidth,
-    height: {chart_height},
-    layout: {{
-      background: {{ type: 'solid', color: '#ffffff' }},
-      textColor: '#64748b',
-      fontFamily: "'SF Mono', 'Consolas', monospace",
-      fontSize: 11,
-    }},
-    grid: {{
-      vertLines: {{ color: 'rgba(226,232,240,0.4)', style: 1 }},
-      horzLines: {{ color: 'rgba(226,232,240,0.4)', style: 1 }},
-    }},
-    crosshair: {{
-      mode: LightweightCharts.CrosshairMode.Normal,
-      vertLine: {{
-        width: 1, color: 'rgba(100,116,139,0.35)',
-        style: LightweightCharts.LineStyle.Dashed,
-        labelVisible: false,
-      }},
-      horzLine: {{
-        width: 1, color: 'rgba(100,116,139,0.35)',
-        style: LightweightCharts.LineStyle.Dashed,
-        labelBackgroundColor: '#475569',
-      }},
-    }},
-    rightPriceScale: {{
-      borderColor: '#e2e8f0',
-      scaleMargins: {{ top: 0.08, bottom: 0.25 }},
-      autoScale: true,
-    }},
-    timeScale: {{
-      borderColor: '#e2e8f0',
-      timeVisible: false,
-      secondsVisible: false,
-      rightOffset: 3,
-      barSpacing: {default_bar_spacing},
-      minBarSpacing: 0.5,
-      fixLeftEdge: false,
-      fixRightEdge: false,
-      tickMarkFormatter: function(time) {{
-        // 가상날짜 → 실제날짜 변환하여 표시
-        const key = time.year + '-' +
-          String(time.month).padStart(2,'0') + '-' +
-          String(time.day).padStart(2,'0');
-        const real = dateMap[key];
-        if (real) {{
-          const parts = real.split('-');
-          return parts[0].slice(2) + '/' + parts[1];
-        }}
-        return '';
-      }},
-    }},
-    handleScroll: {{
-      mouseWheel: true,
-      pressedMouseMove: true,
-      horzTouchDrag: true,
-      vertTouchDrag: false,
-    }},
-    handleScale: {{
-      axisPressedMouseMove: true,
-      mouseWheel: true,
-      pinch: true,
-    }},
-    localization: {{
-      timeFormatter: function(time) {{
-        const key = time.year + '-' +
-          String(time.month).padStart(2,'0') + '-' +
-          String(time.day).padStart(2,'0');
-        return dateMap[key] || key;
-      }},
-    }},
-  }});
-
-  // ── 캔들스틱 ──
-  const candleSeries = chart.addCandlestickSeries({{
-    upColor: '#10b981',
-    downColor: '#ef4444',
-    borderUpColor: '#10b981',
-    borderDownColor: '#ef4444',
-    wickUpColor: '#10b981',
-    wickDownColor: '#ef4444',
-    priceFormat: {{ type: 'price', precision: 0, minMove: 1 }},
-  }});
-  const candleData = {candle_json};
-  candleSeries.setData(candleData);
-
-  // 마커 (이벤트) — 캔들 날짜에 정확히 스냅됨
-  const markers = {marker_json};
-  if (markers.length > 0) {{
-    candleSeries.setMarkers(markers);
-  }}
-
-  // ── 이동평균선 ──
-  const ma20Series = chart.addLineSeries({{
-    color: '#f59e0b', lineWidth: 1.5, lineStyle: 0,
-    priceLineVisible: false, lastValueVisible: false,
-    crosshairMarkerVisible: false,
-  }});
-  ma20Series.setData({ma20_json});
-
-  const ma60Series = chart.addLineSeries({{
-    color: '#3b82f6', lineWidth: 1.5, lineStyle: 0,
-    priceLineVisible: false, lastValueVisible: false,
-    crosshairMarkerVisible: false,
-  }});
-  ma60Series.setData({ma60_json});
-
-  const ma120Series = chart.addLineSeries({{
-    color: '#8b5cf6', lineWidth: 1.5, lineStyle: 0,
-    priceLineVisible: false, lastValueVisible: false,
-    crosshairMarkerVisible: false,
-  }});
-  ma120Series.setData({ma120_json});
-
-  // ── 유동성 (별도 price scale, 영역 차트) ──
-  const liqSeries = chart.addAreaSeries({{
-    topColor: 'rgba(59,130,246,0.12)',
-    bottomColor: 'rgba(59,130,246,0.01)',
-    lineColor: 'rgba(59,130,246,0.45)',
-    lineWidth: 1.5,
-    priceScaleId: 'liq',
-    priceLineVisible: false,
-    lastValueVisible: false,
-    crosshairMarkerVisible: false,
-    priceFormat: {{ type: 'custom', formatter: (p) => p.toLocaleString() + '{liq_suffix}' }},
-  }});
-  chart.priceScale('liq').applyOptions({{
-    scaleMargins: {{ top: 0.50, bottom: 0.25 }},
-    borderVisible: false,
-    visible: false,
-  }});
-  liqSeries.setData({liq_json});
-
-  // ── 거래량 히스토그램 ──
-  const volumeSeries = chart.addHistogramSeries({{
-    priceFormat: {{ type: 'volume' }},
-    priceScaleId: 'vol',
-    priceLineVisible: false,
-    lastValueVisible: false,
-  }});
-  chart.priceScale('vol').applyOptions({{
-    scaleMargins: {{ top: 0.82, bottom: 0 }},
-    borderVisible: false,
-    visible: false,
-  }});
-  volumeSeries.setData({volume_json});
-
-  // ── 크로스헤어 실시간 정보 ──
-  const fmt = (n) => n != null ? n.toLocaleString(undefined, {{maximumFractionDigits:0}}) : '-';
-  const fmtVol = (n) => {{
-    if (n == null) return '-';
-    if (n >= 1e9) return (n/1e9).toFixed(1) + 'B';
-    if (n >= 1e6) return (n/1e6).toFixed(1) + 'M';
-    if (n >= 1e3) return (n/1e3).toFixed(1) + 'K';
-    return n.toFixed(0);
-  }};
-
-  const ma20Map = new Map({ma20_json}.map(d => [d.time, d.value]));
-  const ma60Map = new Map({ma60_json}.map(d => [d.time, d.value]));
-  const ma120Map = new Map({ma120_json}.map(d => [d.time, d.value]));
-  const liqMap = new Map({liq_json}.map(d => [d.time, d.value]));
-  const volMap = new Map({volume_json}.map(d => [d.time, d.value]));
-  const candleMap = new Map(candleData.map(d => [d.time, d]));
-
-  function timeToKey(t) {{
-    if (typeof t === 'string') return t;
-    if (t && t.year) return t.year + '-' + String(t.month).padStart(2,'0') + '-' + String(t.day).padStart(2,'0');
-    return null;
-  }}
-
-  function updateInfo(param) {{
-    let t;
-    if (param && param.time) {{
-      t = timeToKey(param.time);
-    }} else if (candleData.length > 0) {{
-      t = candleData[candleData.length - 1].time;
-    }} else {{ return; }}
-    if (!t) return;
-
-    const candle = candleMap.get(t);
-    if (!candle) return;
-
-    // 실제 날짜 표시
-    const realDate = dateMap[t] || t;
-    document.getElementById('v-date').textContent = realDate;
-
-    const o = candle.open, h = candle.high, l = candle.low, c = candle.close;
-    const isUp = c >= o;
-    const clr = isUp ? '#10b981' : '#ef4444';
-
-    document.getElementById('v-open').textContent = fmt(o);
-    document.getElementById('v-high').textContent = fmt(h);
-    document.getElementById('v-high').style.color = '#10b981';
-    document.getElementById('v-low').textContent = fmt(l);
-    document.getElementById('v-low').style.color = '#ef4444';
-    document.getElementById('v-close').textContent = fmt(c);
-    document.getElementById('v-close').style.color = clr;
-
-    // 전봉 대비 변화율
-    const idx = candleData.findIndex(d => d.time === t);
-    if (idx > 0) {{
-      const prevC = candleData[idx-1].close;
-      const chg = ((c - prevC) / prevC * 100);
-      const arrow = chg >= 0 ? '▲' : '▼';
-      document.getElementById('v-chg').textContent = arrow + ' ' + Math.abs(chg).toFixed(2) + '%';
-      document.getElementById('v-chg').style.color = chg >= 0 ? '#10b981' : '#ef4444';
-    }}
-
-    const v = volMap.get(t);
-    document.getElementById('v-vol').textContent = fmtVol(v);
-
-    const liqVal = liqMap.get(t);
-    document.getElementById('v-liq').textContent = liqVal ? fmt(liqVal) + '{liq_suffix}' : '-';
-
-    const m20 = ma20Map.get(t);
-    document.getElementById('v-ma20').textContent = 'MA20 ' + (m20 ? fmt(m20) : '-');
-    const m60 = ma60Map.get(t);
-    document.getElementById('v-ma60').textContent = 'MA60 ' + (m60 ? fmt(m60) : '-');
-    const m120 = ma120Map.get(t);
-    document.getElementById('v-ma120').textContent = 'MA120 ' + (m120 ? fmt(m120) : '-');
-  }}
-
-  chart.subscribeCrosshairMove(updateInfo);
-  updateInfo(null);
-
-  // ── 반응형 리사이즈 ──
-  const resizeObserver = new ResizeObserver(entries => {{
-    for (const entry of entries) {{
-      chart.applyOptions({{ width: entry.contentRect.width }});
-    }}
-  }});
-  resizeObserver.observe(wrapper);
-
-  // 초기 뷰: 전체 데이터 표시
-  chart.timeScale().fitContent();
-}})();
-</script>
-</body>
-</html>
-"""
-
-# ── Streamlit에 HTML 삽입 ──
-components.html(lw_html, height=chart_height + 10, scrolling=False)
-
-# 최근 캔들 요약
-if len(ohlc_chart) >= 2:
-    last = ohlc_chart.iloc[-1]
-    prev = ohlc_chart.iloc[-2]
-    chg = (last["Close"] - prev["Close"]) / prev["Close"] * 100
-    chg_arrow = "▲" if chg >= 0 else "▼"
-    chg_color = "green" if chg >= 0 else "red"
-    chg_direction = "상승" if chg >= 0 else "하락"
+render_chart(country, idx_name, idx_ticker, df, ohlc_raw, market_snapshot_at, liq_regimes, period)
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 유동성 선행/후행 교차상관
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+if lead_lag:
     st.markdown(
-        f'<div class="guide-box" role="status" aria-label="최근 {tf} 요약: 종가 {last["Close"]:,.0f}, {chg_direction} {abs(chg):.2f}%">'
-        f'<span aria-hidden="true">🕯️</span> <strong>최근 {tf}:</strong> '
-        f'시 <strong>{last["Open"]:,.0f}</strong> · '
-        f'고 <strong>{last["High"]:,.0f}</strong> · '
-        f'저 <strong>{last["Low"]:,.0f}</strong> · '
-        f'종 <strong>{last["Close"]:,.0f}</strong> '
-        f'<span style="color:var(--accent-{chg_color})">{chg_arrow} {chg:+.2f}%<span class="sr-only"> ({chg_direction})</span></span>'
-        f'<br>'
-        f'이평선: <span style="color:#f59e0b">MA20</span> · '
-        f'<span style="color:#3b82f6">MA60</span> · '
-        f'<span style="color:#8b5cf6">MA120</span> · '
-        f'<span style="color:rgba(59,130,246,0.6)">파란 영역</span> = {CC["liq_label"]}'
-        f'</div>',
+        f'<section aria-label="유동성 선행/후행 교차상관"><div class="card">'
+        f'<h2 class="card-title"><span class="dot" style="background:var(--accent-blue)" aria-hidden="true"></span> '
+        f'유동성 → {idx_name} 선행/후행 교차상관</h2>'
+        f'<div class="guide-box" style="margin-top:0">'
+        f'{CC["liq_label"]} 1개월 변화율이 k거래일 뒤 {idx_name} 1개월 수익률과 얼마나 같이 움직이는지 (최근 3년 롤링 창). '
+        f'현재 최대 상관 <strong>ρ={lead_lag["best_corr"]:+.2f}</strong> @ <strong>{lead_lag["best_lag"]}거래일</strong> 선행 · '
+        f'동시점 ρ={lead_lag["same_day_corr"]:+.2f}'
+        f'</div></div></section>',
         unsafe_allow_html=True,
     )
+    lead_fig = make_subplots(rows=1, cols=2, column_widths=[0.4, 0.6], horizontal_spacing=0.08,
+                             subplot_titles=("최근 3년: 시차별 상관", "시차별 상관 추이 (롤링)"))
+    lead_fig.add_trace(go.Scatter(
+        x=lead_lag["lags"], y=lead_lag["profile"], mode="lines", name="상관계수",
+        line=dict(color=C["liq"], width=2), fill="tozeroy", fillcolor=C["liq_fill"],
+        hovertemplate="%{x}거래일 선행<br>ρ=%{y:.3f}<extra></extra>",
+    ), row=1, col=1)
+    lead_fig.add_vline(x=lead_lag["best_lag"], line_width=1, line_dash="dot", line_color=C["corr_pos"], row=1, col=1)
+    lead_fig.add_trace(go.Heatmap(
+        x=lead_lag["dates"], y=lead_lag["lags"], z=lead_lag["surface"].T,
+        colorscale="RdBu", reversescale=True, zmid=0, zmin=-1, zmax=1,
+        colorbar=dict(title="ρ", thickness=10, len=0.9),
+        hovertemplate="%{x|%Y-%m-%d}<br>%{y}거래일 선행<br>ρ=%{z:.3f}<extra></extra>",
+    ), row=1, col=2)
+    lead_fig.add_trace(go.Scatter(
+        x=lead_lag["best_lag_path"].index, y=lead_lag["best_lag_path"].values, mode="lines", name="최적 시차",
+        line=dict(color="#0f172a", width=1), hovertemplate="%{x|%Y-%m-%d}<br>최적 %{y}거래일<extra></extra>",
+    ), row=1, col=2)
+    lead_fig.update_layout(**BASE_LAYOUT)
+    lead_fig.update_layout(height=340, showlegend=False, hovermode="closest")
+    lead_fig.update_xaxes(**ax({"title": "시차 (거래일)"}), row=1, col=1)
+    lead_fig.update_yaxes(**ax({"range": [-1, 1]}), row=1, col=1)
+    lead_fig.update_xaxes(**ax(), row=1, col=2)
+    lead_fig.update_yaxes(**ax({"title": "시차 (거래일)"}), row=1, col=2)
+    st.plotly_chart(lead_fig, config={"displayModeBar": False})
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# 이벤트 타임라인
+# 센티먼트 점수 히스토리
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-event_count = sum(1 for d,_,_,_,_ in ALL_EVENTS if pd.to_datetime(d) >= dff.index.min())
-st.markdown(f"""<section aria-label="주요 매크로 이벤트 타임라인"><div class="card">
-    <h2 class="card-title"><span class="dot" style="background:var(--accent-blue)" aria-hidden="true"></span> 주요 매크로 이벤트 타임라인 ({event_count} 이벤트)</h2>
-""", unsafe_allow_html=True)
+if len(sentiment_history["score"]):
+    hist_score = sentiment_history["score"]
+    st.markdown(
+        f'<section aria-label="센티먼트 점수 히스토리"><div class="card">'
+        f'<h2 class="card-title"><span class="dot" style="background:var(--accent-purple)" aria-hidden="true"></span> '
+        f'Fear & Greed 점수 추이</h2>'
+        f'<div class="guide-box" style="margin-top:0">'
+        f'Daily Brief의 7개 지표 점수를 {hist_score.index[0]:%Y}년부터 매일 같은 식으로 계산. '
+        f'현재 <strong>{hist_score.iloc[-1]:.1f}</strong> · 전 구간 백분위 <strong>{sentiment_history["percentile"]:.0f}</strong>'
+        f'</div></div></section>',
+        unsafe_allow_html=True,
+    )
+    senti_fig = go.Figure()
+    upper = 100
+    for floor, label, color in SENTIMENT_BANDS:
+        senti_fig.add_hrect(y0=max(floor, 0), y1=upper, fillcolor=color, opacity=0.06, line_width=0, layer="below")
+        upper = floor
+    senti_fig.add_trace(go.Scatter(
+        x=hist_score.index, y=hist_score.values, mode="lines", name="센티먼트",
+        line=dict(color="#1e293b", width=1.2), hovertemplate="%{x|%Y-%m-%d}<br>점수 %{y:.1f}<extra></extra>",
+    ))
+    senti_fig.update_layout(**BASE_LAYOUT)
+    senti_fig.update_layout(height=280, showlegend=False, margin=dict(t=20, b=30, l=40, r=10))
+    senti_fig.update_xaxes(**ax())
+    senti_fig.update_yaxes(**ax({"range": [0, 100]}))
+    st.plotly_chart(senti_fig, config={"displayModeBar": False})
 
-tl_html = '<div class="timeline" role="list" aria-label="이벤트 목록">'
-for date_str, title, desc, emoji, direction in reversed(ALL_EVENTS):
-    dt = pd.to_datetime(date_str)
-    if dt < dff.index.min():
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 시그널 룰 백테스트 (전 지수)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+bt_rows_html = []
+for bt_country, bt_name, bt in backtest_all_indices():
+    row_cls = ' class="current"' if bt_name == idx_name else ""
+    if bt is None:
+        bt_rows_html.append(f'<tr{row_cls}><td>{bt_name} <small>({bt_country})</small></td>'
+                            f'<td colspan="6" style="text-align:center">데이터 불러오는 중</td></tr>')
         continue
-    dir_cls = "up" if direction == "up" else "down"
-    dir_label = "상승" if direction == "up" else "하락"
-    tl_html += f"""
-    <div class="tl-item" role="listitem" aria-label="{date_str}: {title} - {dir_label}">
-        <time class="tl-date" datetime="{date_str}">{date_str}</time>
-        <div class="tl-icon" aria-hidden="true">{emoji}</div>
-        <div class="tl-content">
-            <div class="tl-title">{title}</div>
-            <div class="tl-desc">{desc}</div>
-        </div>
-        <div class="tl-dir {dir_cls}" aria-label="시장 방향: {dir_label}">{dir_label}</div>
-    </div>"""
-tl_html += "</div>"
-st.markdown(tl_html + "</div></section>", unsafe_allow_html=True)
+    bt_rows_html.append(
+        f'<tr{row_cls}><td>{bt_name} <small>({bt_country}, {bt["start"]:%Y}~)</small></td>'
+        f'<td>{bt["hit_rate"]:.0f}%</td>'
+        f'<td>{bt["cagr"]:+.1f}%</td><td>{bt["bh_cagr"]:+.1f}%</td>'
+        f'<td>{bt["mdd"]:.1f}%</td><td>{bt["bh_mdd"]:.1f}%</td>'
+        f'<td>{bt["turnover"]:.1f}x</td></tr>'
+    )
+st.markdown(
+    f'<section aria-label="시그널 룰 백테스트"><div class="card">'
+    f'<h2 class="card-title"><span class="dot" style="background:var(--accent-green)" aria-hidden="true"></span> '
+    f'강세/약세 시그널 백테스트</h2>'
+    f'<div class="guide-box" style="margin-top:0">'
+    f'Daily Brief 시그널과 같은 규칙(상관·유동성 3M·지수 1M·유동성 YoY)을 매 거래일 적용 → '
+    f'다음 거래일부터 비중 확대 100% · 중립 50% · 비중 축소 0%로 지수를 보유. '
+    f'적중률은 확대/축소 판정 뒤 1개월 수익률 방향 기준. 거래비용·현금 이자·데이터 발표 시차는 반영하지 않음.'
+    f'</div>'
+    f'<table class="bt-table"><thead><tr><th>지수</th><th>적중률</th><th>CAGR</th><th>B&amp;H CAGR</th>'
+    f'<th>MDD</th><th>B&amp;H MDD</th><th>연 회전율</th></tr></thead>'
+    f'<tbody>{"".join(bt_rows_html)}</tbody></table>'
+    f'</div></section>',
+    unsafe_allow_html=True,
+)
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# 이벤트 타임라인 (프래그먼트)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+def _impact(label, val):
+    if np.isnan(val):
+        return f'<span>{label} —</span>'
+    return f'<span class="{"up" if val >= 0 else "down"}">{label} {val:+.1f}%</span>'
+
+
+@fragment
+def render_timeline(country, idx_name, df, event_study, period):
+    """이벤트 목록과 실현 영향 — 표시 기간은 차트와 같은 컨트롤 바 기간"""
+    CC = COUNTRY_CONFIG[country]
+    events, event_dates = country_events(country)
+    cutoff = datetime.now() - timedelta(days=365 * PERIOD_YEARS[period])
+
+    # 표시 기간 시작 이전 이벤트는 제외 (as-of 위치 -1)
+    event_visible = asof_positions(df.index[df.index >= pd.to_datetime(cutoff)], event_dates) >= 0
+    event_count = int(event_visible.sum())
+    event_hits = event_study["hit_1M"].to_numpy()[event_visible]
+    event_hit_text = (f" · 1개월 후 방향 일치 {int(np.nansum(event_hits))}/{int(np.sum(~np.isnan(event_hits)))}"
+                      if np.any(~np.isnan(event_hits)) else "")
+    st.markdown(f"""<section aria-label="주요 매크로 이벤트 타임라인"><div class="card">
+        <h2 class="card-title"><span class="dot" style="background:var(--accent-blue)" aria-hidden="true"></span> 주요 매크로 이벤트 타임라인 ({event_count} 이벤트{event_hit_text})</h2>
+    """, unsafe_allow_html=True)
+
+    tl_html = '<div class="timeline" role="list" aria-label="이벤트 목록">'
+    for (date_str, title, desc, emoji, direction), visible, impact in zip(
+            reversed(events), event_visible[::-1], event_study.iloc[::-1].to_dict("records")):
+        if not visible:
+            continue
+        dir_cls = "up" if direction == "up" else "down"
+        dir_label = "상승" if direction == "up" else "하락"
+        impact_html = (
+            "".join(_impact(f"{idx_name} {w}", impact[f"idx_post_{w}"]) for w in EVENT_WINDOWS)
+            + _impact("직전 1M", impact["idx_pre_1M"])
+            + _impact(f"{CC['liq_label']} 3M", impact["liq_post_3M"])
+        )
+        tl_html += f"""
+        <div class="tl-item" role="listitem" aria-label="{date_str}: {title} - {dir_label}">
+            <time class="tl-date" datetime="{date_str}">{date_str}</time>
+            <div class="tl-icon" aria-hidden="true">{emoji}</div>
+            <div class="tl-content">
+                <div class="tl-title">{title}</div>
+                <div class="tl-desc">{desc}</div>
+                <div class="tl-impact" aria-label="이벤트 이후 실제 변화">{impact_html}</div>
+            </div>
+            <div class="tl-dir {dir_cls}" aria-label="시장 방향: {dir_label}">{dir_label}</div>
+        </div>"""
+    tl_html += "</div>"
+    st.markdown(tl_html + "</div></section>", unsafe_allow_html=True)
+
+
+render_timeline(country, idx_name, df, event_study, period)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━